@@ -1,171 +1,315 @@
-import os
-import pygame
-import random
-import util
-from globals import Globals
-
-RES_PATH = "res"
-images = {}
-
-
-def load_image(name):
-    # If image has been loaded, use image from dict
-    if name in images.keys():
-        image = images[name]
-    else:
-        # Else, add loaded image to dict
-        path = os.path.join(RES_PATH, 'img', name)
-        image = pygame.image.load(path).convert_alpha()
-        images[name] = image
-    return image
-
-def load_sfx(name, volume=0.4):
-    path = os.path.join(RES_PATH, 'audio', name)
-    sound = pygame.mixer.Sound(path)
-    sound.set_volume(volume*0.75)
-    sfx.append(sound)
-    return sound
-
-def load_music(name):
-    path = os.path.join(RES_PATH, 'audio', name)
-    return path
-
-def font_path(name):
-    return os.path.join(RES_PATH, name)
-
-
-
-MAIN_FONT = font_path("StayPuft.ttf")
-
-MUSIC_OVERWORLD = load_music("overworld.wav")
-MUSIC_CAVE = load_music("cave.wav")
-MUSIC_RAIN = load_music("rain.wav")
-MUSIC_WINTER = load_music("winter.wav")
-MUSIC_FIREPLACE = load_music("fireplace.wav")
-MUSIC_FOREST = load_music("forest.wav")
-MUSIC_BEACH = load_music("beach.wav")
-
-sfx = []
-SFX_HIT_1 = load_sfx("hit_1.wav", 0.2)
-SFX_HIT_2 = load_sfx("hit_2.wav")
-SFX_HIT_3 = load_sfx("hit_3.wav", 0.3)
-SFX_SHOOT_1 = load_sfx("shoot_1.wav", 0.45)
-SFX_SHOOT_2 = load_sfx("shoot_2.wav", 0.45)
-SFX_SHOOT_SG = load_sfx("shoot_sg.wav", 0.15)
-SFX_SHOOT_ARROW = load_sfx("shoot_arrow.wav")
-SFX_SHOOT_GRENADE = load_sfx("shoot_grenade.wav", 0.5)
-SFX_BOOM = load_sfx("boom.wav", 0.3)
-SFX_FREEZE = load_sfx("freeze.wav", 0.1)
-
-SFX_COLLECT = load_sfx("collect.wav", 0.4)
-SFX_BUFF = load_sfx("buff.wav", 0.8)
-SFX_EAT = load_sfx("eat.wav", 1)
-SFX_OW_PLAYER = load_sfx("ow_player.wav", 0.8)
-
-def random_hit_sfx():
-    return random.choice((SFX_HIT_1, SFX_HIT_2, SFX_HIT_3))
-
-def random_shoot_sfx():
-    return random.choice((SFX_SHOOT_1, SFX_SHOOT_2))
-
-
-def play_sound_old(sound, dist=None):
-    if Globals.sound_on:
-        played_sound = sound.play()
-
-        if play_sound is not None and dist is not None:
-            volume = 1 - (dist / 1000)
-            played_sound.set_volume(min(1, volume))
-
-        """if pan != 0:
-            volume = sound.get_volume()
-            played_sound.set_volume(volume + pan, volume - pan)"""
-
-
-def play_sound(sound, pos=None, player_pos=None):
-    if Globals.sound_on:
-        played_sound = sound.play()
-
-        if played_sound is not None:
-            if pos is not None and player_pos is not None:
-                dist = pos.dist(player_pos)
-                volume = 1 - (dist / 1000)
-                played_sound.set_volume(min(1, volume))
-
-        """if pan != 0:
-            volume = sound.get_volume()
-            played_sound.set_volume(volume + pan, volume - pan)"""
-
-
-IMG_CURSOR_ARROW = load_image("ui_cursor_arrow.png")
-IMG_CURSOR_TARGET = load_image("ui_cursor_target.png")
-IMG_SOUND_ON = util.scale_image(load_image("ui_sound_on.png"), 0.4)
-IMG_SOUND_OFF = util.scale_image(load_image("ui_sound_off.png"), 0.4)
-IMG_PAUSE = util.scale_image(load_image("ui_pause.png"), 0.4)
-
-
-IMG_BG_CITY = load_image("bg_city_alt.png")
-
-IMG_PLAYER_ALIVE = load_image("player_alive.png")
-IMG_PLAYER_DEAD = load_image("player_dead.png")
-IMG_PLAYER_OW = load_image("player_ow.png")
-IMG_PLAYER_METALSUIT = load_image("player_metalsuit.png")
-IMG_PLAYER_INVIS = load_image("player_invis.png")
-IMG_MERCURY_WINGS = load_image("mercury_wings.png")
-
-IMG_BRAWLER = load_image("brawler.png")
-IMG_BRAWLER_COLD = load_image("brawler_cold.png")
-IMG_BRAWLER_BOSS = load_image("brawler_boss.png")
-IMG_RANGER = load_image("ranger.png")
-IMG_RANGER_BOSS = load_image("ranger_boss.png")
-IMG_BOOMER = load_image("boomer.png")
-IMG_ZOOMER = load_image("zoomer.png")
-IMG_CAR_FRONT = load_image("car_front.png")
-IMG_CAR_SIDE = load_image("car_side.png")
-IMG_COOLER = load_image("cooler.png")
-IMG_FREEZER = load_image("freezer.png")
-IMG_YETI = load_image("yeti.png")
-
-IMG_TROOP = load_image("troop.png")
-
-
-IMG_PROJECTILE_BULLET = load_image("projectile_bullet.png")
-IMG_PROJECTILE_ARROW = load_image("projectile_arrow.png")
-IMG_PROJECTILE_SNOWFLAKE = load_image("projectile_snowflake.png")
-IMG_POOF = load_image("poof.png")
-IMG_BLOOD = load_image("blood.png")
-IMG_EXPLOSION = load_image("explosion.png")
-IMG_FROZEN_CLOUD = load_image("frozen_cloud.png")
-IMG_ICE_CUBE = load_image("ice_cube.png")
-
-
-IMG_TREE = load_image("tree.png")
-IMG_TREE_CITY = load_image("tree_city.png")
-IMG_TREE_WINTER = load_image("tree_winter.png")
-IMG_ROCK = load_image("rock.png")
-IMG_STREET_LIGHT = load_image("street_light.png")
-IMG_UMBRELLA = load_image("umbrella.png")
-IMG_TREE_PALM = load_image("tree_palm.png")
-
-IMG_GRAVE = load_image("grave.png")
-IMG_OFFICE = load_image("office.png")
-IMG_HOUSE = load_image("house.png")
-IMG_IGLOO = load_image("igloo.png")
-IMG_CAVE = load_image("cave.png")
-IMG_CAVE_EXIT = load_image("cave_exit.png")
-IMG_DOOR = load_image("door.png")
-IMG_FIREPLACE = load_image("fireplace.png")
-IMG_NEXT_SIGN = load_image("next.png")
-IMG_LAST_SIGN = load_image("last.png")
-
-IMG_STANDARD_GUN = load_image("item_standard_gun.png")
-IMG_DMG_UP = load_image("item_dmg_up.png")
-IMG_APPLE = load_image("item_apple.png")
-IMG_SHOTGUN = load_image("item_shotgun.png")
-IMG_ARROWS = load_image("item_arrows.png")
-IMG_GRENADE = load_image("item_grenade.png")
-IMG_SPEED_SHOES = load_image("item_speed.png")
-IMG_SHIELD = load_image("item_shield.png")
-IMG_METALSUIT = load_image("item_metalsuit.png")
-IMG_FREEZE_RAY = load_image("freeze_ray.png")
-IMG_WRENCH = load_image("item_wrench.png")
\ No newline at end of file
+import io
+import os
+import time
+import queue
+import pygame
+import random
+import threading
+from collections import OrderedDict
+import util
+import bake
+from globals import Globals
+
+RES_PATH = "res"
+images = {}
+image_names = {}  # id(image) -> its file name, for looking up baked copies of loaded images
+sound_files = {}  # Sound file name -> its bytes, read ahead by the preload thread
+
+# Filled by the preload thread with (constant name, decoded image or sound file bytes), finished on the main thread
+preloaded = queue.Queue()
+preload_total = 0
+preload_done = 0
+
+# Scaled copies of images shared by everything that draws them: (id(image), scale) -> (image, scaled image)
+# The source image is kept in the entry so its id can't be reused while the entry exists
+SCALED_CACHE_SIZE = 512
+scaled_images = OrderedDict()
+
+# Rotated copies of images, with angles snapped to ANGLE_STEPS directions: (id(image), step) -> (image, rotated image)
+ANGLE_STEPS = 64
+ROTATED_CACHE_SIZE = 1024
+rotated_images = OrderedDict()
+
+
+def load_image(name, scale=1):
+    if scale != 1:
+        return scaled(load_image(name), scale)
+    # If image has been loaded, use image from dict
+    if name in images.keys():
+        image = images[name]
+    else:
+        # Else, add loaded image to dict
+        path = os.path.join(RES_PATH, 'img', name)
+        image = pygame.image.load(path).convert_alpha()
+        add_image(name, image)
+    return image
+
+def add_image(name, image):
+    """ Keep a loaded image under its file name, where load_image and scaled (for baked copies) look it up """
+    images[name] = image
+    image_names[id(image)] = name
+
+def scaled(image, scale):
+    """ Get a shared scaled copy of image. scale is either a multiplier or an exact (width, height) """
+    key = (id(image), scale)
+    entry = scaled_images.get(key)
+    if entry is not None:
+        scaled_images.move_to_end(key)
+        return entry[1]
+
+    if isinstance(scale, tuple):
+        scaled_image = pygame.transform.scale(image, scale)
+    else:
+        scaled_image = None
+        if id(image) in image_names:
+            scaled_image = bake.find(image_names[id(image)], scale)
+        if scaled_image is None:
+            scaled_image = util.scale_image(image, scale)
+
+    scaled_images[key] = (image, scaled_image)
+    if len(scaled_images) > SCALED_CACHE_SIZE:
+        scaled_images.popitem(last=False)  # Forget the least recently used image
+    return scaled_image
+
+def rotated(image, angle):
+    """ Get a shared copy of image rotated by angle degrees, snapped to the nearest of ANGLE_STEPS directions """
+    step = round(angle * ANGLE_STEPS / 360) % ANGLE_STEPS
+    key = (id(image), step)
+    entry = rotated_images.get(key)
+    if entry is not None:
+        rotated_images.move_to_end(key)
+        return entry[1]
+
+    rotated_image = pygame.transform.rotate(image, step * 360 / ANGLE_STEPS)
+    rotated_images[key] = (image, rotated_image)
+    if len(rotated_images) > ROTATED_CACHE_SIZE:
+        rotated_images.popitem(last=False)
+    return rotated_image
+
+def load_sfx(name, volume=0.4):
+    if name in sound_files:
+        sound = pygame.mixer.Sound(file=io.BytesIO(sound_files.pop(name)))
+    else:
+        path = os.path.join(RES_PATH, 'audio', name)
+        sound = pygame.mixer.Sound(path)
+    sound.set_volume(volume*0.75)
+    sfx.append(sound)
+    return sound
+
+def load_music(name):
+    path = os.path.join(RES_PATH, 'audio', name)
+    return path
+
+def font_path(name):
+    return os.path.join(RES_PATH, name)
+
+
+
+MAIN_FONT = font_path("StayPuft.ttf")
+
+MUSIC_OVERWORLD = load_music("overworld.wav")
+MUSIC_CAVE = load_music("cave.wav")
+MUSIC_RAIN = load_music("rain.wav")
+MUSIC_WINTER = load_music("winter.wav")
+MUSIC_FIREPLACE = load_music("fireplace.wav")
+MUSIC_FOREST = load_music("forest.wav")
+MUSIC_BEACH = load_music("beach.wav")
+
+sfx = []
+# Sound effect constants and their (file, volume), each loaded the first time it's used
+SOUNDS = {
+    "SFX_HIT_1": ("hit_1.wav", 0.2),
+    "SFX_HIT_2": ("hit_2.wav", 0.4),
+    "SFX_HIT_3": ("hit_3.wav", 0.3),
+    "SFX_SHOOT_1": ("shoot_1.wav", 0.45),
+    "SFX_SHOOT_2": ("shoot_2.wav", 0.45),
+    "SFX_SHOOT_SG": ("shoot_sg.wav", 0.15),
+    "SFX_SHOOT_ARROW": ("shoot_arrow.wav", 0.4),
+    "SFX_SHOOT_GRENADE": ("shoot_grenade.wav", 0.5),
+    "SFX_BOOM": ("boom.wav", 0.3),
+    "SFX_FREEZE": ("freeze.wav", 0.1),
+
+    "SFX_COLLECT": ("collect.wav", 0.4),
+    "SFX_BUFF": ("buff.wav", 0.8),
+    "SFX_EAT": ("eat.wav", 1),
+    "SFX_OW_PLAYER": ("ow_player.wav", 0.8),
+}
+
+def random_hit_sfx():
+    return get(random.choice(("SFX_HIT_1", "SFX_HIT_2", "SFX_HIT_3")))
+
+def random_shoot_sfx():
+    return get(random.choice(("SFX_SHOOT_1", "SFX_SHOOT_2")))
+
+
+def play_sound_old(sound, dist=None):
+    if Globals.sound_on:
+        played_sound = sound.play()
+
+        if play_sound is not None and dist is not None:
+            volume = 1 - (dist / 1000)
+            played_sound.set_volume(min(1, volume))
+
+        """if pan != 0:
+            volume = sound.get_volume()
+            played_sound.set_volume(volume + pan, volume - pan)"""
+
+
+def play_sound(sound, pos=None, player_pos=None):
+    if Globals.sound_on:
+        played_sound = sound.play()
+
+        if played_sound is not None:
+            if pos is not None and player_pos is not None:
+                dist = pos.dist(player_pos)
+                volume = 1 - (dist / 1000)
+                played_sound.set_volume(min(1, volume))
+
+        """if pan != 0:
+            volume = sound.get_volume()
+            played_sound.set_volume(volume + pan, volume - pan)"""
+
+
+# Image constants and their (file, scale), each loaded the first time it's used
+IMAGES = {
+    "IMG_CURSOR_ARROW": ("ui_cursor_arrow.png", 1),
+    "IMG_CURSOR_TARGET": ("ui_cursor_target.png", 1),
+    "IMG_SOUND_ON": ("ui_sound_on.png", 0.4),
+    "IMG_SOUND_OFF": ("ui_sound_off.png", 0.4),
+    "IMG_PAUSE": ("ui_pause.png", 0.4),
+
+
+    "IMG_BG_CITY": ("bg_city_alt.png", 1),
+
+    "IMG_PLAYER_ALIVE": ("player_alive.png", 1),
+    "IMG_PLAYER_DEAD": ("player_dead.png", 1),
+    "IMG_PLAYER_OW": ("player_ow.png", 1),
+    "IMG_PLAYER_METALSUIT": ("player_metalsuit.png", 1),
+    "IMG_PLAYER_INVIS": ("player_invis.png", 1),
+    "IMG_MERCURY_WINGS": ("mercury_wings.png", 1),
+
+    "IMG_BRAWLER": ("brawler.png", 1),
+    "IMG_BRAWLER_COLD": ("brawler_cold.png", 1),
+    "IMG_BRAWLER_BOSS": ("brawler_boss.png", 1),
+    "IMG_RANGER": ("ranger.png", 1),
+    "IMG_RANGER_BOSS": ("ranger_boss.png", 1),
+    "IMG_BOOMER": ("boomer.png", 1),
+    "IMG_ZOOMER": ("zoomer.png", 1),
+    "IMG_CAR_FRONT": ("car_front.png", 1),
+    "IMG_CAR_SIDE": ("car_side.png", 1),
+    "IMG_COOLER": ("cooler.png", 1),
+    "IMG_FREEZER": ("freezer.png", 1),
+    "IMG_YETI": ("yeti.png", 1),
+
+    "IMG_TROOP": ("troop.png", 1),
+
+
+    "IMG_PROJECTILE_BULLET": ("projectile_bullet.png", 1),
+    "IMG_PROJECTILE_ARROW": ("projectile_arrow.png", 1),
+    "IMG_PROJECTILE_SNOWFLAKE": ("projectile_snowflake.png", 1),
+    "IMG_POOF": ("poof.png", 1),
+    "IMG_BLOOD": ("blood.png", 1),
+    "IMG_EXPLOSION": ("explosion.png", 1),
+    "IMG_FROZEN_CLOUD": ("frozen_cloud.png", 1),
+    "IMG_ICE_CUBE": ("ice_cube.png", 1),
+
+
+    "IMG_TREE": ("tree.png", 1),
+    "IMG_TREE_CITY": ("tree_city.png", 1),
+    "IMG_TREE_WINTER": ("tree_winter.png", 1),
+    "IMG_ROCK": ("rock.png", 1),
+    "IMG_STREET_LIGHT": ("street_light.png", 1),
+    "IMG_UMBRELLA": ("umbrella.png", 1),
+    "IMG_TREE_PALM": ("tree_palm.png", 1),
+
+    "IMG_GRAVE": ("grave.png", 1),
+    "IMG_OFFICE": ("office.png", 1),
+    "IMG_HOUSE": ("house.png", 1),
+    "IMG_IGLOO": ("igloo.png", 1),
+    "IMG_CAVE": ("cave.png", 1),
+    "IMG_CAVE_EXIT": ("cave_exit.png", 1),
+    "IMG_DOOR": ("door.png", 1),
+    "IMG_FIREPLACE": ("fireplace.png", 1),
+    "IMG_NEXT_SIGN": ("next.png", 1),
+    "IMG_LAST_SIGN": ("last.png", 1),
+
+    "IMG_STANDARD_GUN": ("item_standard_gun.png", 1),
+    "IMG_DMG_UP": ("item_dmg_up.png", 1),
+    "IMG_APPLE": ("item_apple.png", 1),
+    "IMG_SHOTGUN": ("item_shotgun.png", 1),
+    "IMG_ARROWS": ("item_arrows.png", 1),
+    "IMG_GRENADE": ("item_grenade.png", 1),
+    "IMG_SPEED_SHOES": ("item_speed.png", 1),
+    "IMG_SHIELD": ("item_shield.png", 1),
+    "IMG_METALSUIT": ("item_metalsuit.png", 1),
+    "IMG_FREEZE_RAY": ("freeze_ray.png", 1),
+    "IMG_WRENCH": ("item_wrench.png", 1),
+}
+
+
+def __getattr__(name):
+    # Load IMG_ and SFX_ constants the first time they are used, then keep them as plain module attributes
+    if name in IMAGES:
+        file, scale = IMAGES[name]
+        value = load_image(file, scale)
+    elif name in SOUNDS:
+        file, volume = SOUNDS[name]
+        value = load_sfx(file, volume)
+    else:
+        raise AttributeError("module 'assets' has no attribute " + repr(name))
+    globals()[name] = value
+    return value
+
+def get(name):
+    """ Get an IMG_ or SFX_ constant by name, loading it if needed (code inside this module can't rely on __getattr__) """
+    if name in globals():
+        return globals()[name]
+    return __getattr__(name)
+
+
+def start_preload():
+    """ Start reading every image and sound that hasn't been used yet on a background thread """
+    global preload_total, preload_done
+    names = [name for name in list(IMAGES) + list(SOUNDS) if name not in globals()]
+    preload_total = len(names)
+    preload_done = 0
+    threading.Thread(target=preload, args=(names,), daemon=True).start()
+
+def preload(names):
+    for name in names:
+        data = None
+        try:
+            if name in IMAGES:
+                # Only decoding is safe off the main thread, converting to the display format happens in finish_preload
+                data = pygame.image.load(os.path.join(RES_PATH, 'img', IMAGES[name][0]))
+            else:
+                with open(os.path.join(RES_PATH, 'audio', SOUNDS[name][0]), 'rb') as f:
+                    data = f.read()
+        except (pygame.error, OSError):
+            pass  # Leave it to be loaded (and fail loudly) when it's first used
+        preloaded.put((name, data))
+
+def finish_preload(budget=0.004):
+    """ Finish loading what the preload thread has ready, for up to budget seconds, and return the fraction done """
+    global preload_done
+    deadline = time.perf_counter() + budget
+    while preload_done < preload_total and time.perf_counter() < deadline:
+        try:
+            name, data = preloaded.get_nowait()
+        except queue.Empty:
+            break
+        preload_done += 1
+        if name in globals() or data is None:
+            continue  # The game already needed it and loaded it itself
+        if name in IMAGES:
+            file = IMAGES[name][0]
+            if file not in images:
+                add_image(file, data.convert_alpha())
+        elif pygame.mixer.get_init():
+            sound_files[SOUNDS[name][0]] = data
+        else:
+            continue
+        get(name)
+    if preload_total == 0:
+        return 1
+    return preload_done / preload_total
@@ -0,0 +1,167 @@
+import os
+import ast
+import hashlib
+import pygame
+import util
+
+
+"""
+Bakes the scaled copies of images the game asks for into a cache on disk, so they're loaded instead of scaled.
+Bake (or rebuild, after changing any scale) with:
+    python bake.py
+
+The scales come from reading main.py and assets.py: the IMAGES table, and every call that passes an assets.IMG_
+constant followed by a number (entity and item factories, particles), including classes that scale an image
+parameter with a fixed assets.scaled call (like Item).
+Cached files are named after a hash of their source image, so changing an image makes its old copies unused
+until the next bake. assets.scaled uses a cached copy when there is one, and scales the image itself when not.
+"""
+
+IMG_PATH = os.path.join("res", "img")
+CACHE_PATH = os.path.join("res", "cache")
+SOURCES = ("main.py", "assets.py")
+
+source_hashes = {}  # Image file name -> hash of its contents
+baked_files = None  # Names of the files in CACHE_PATH, listed the first time find is called
+baked_scales = set([])  # The image and scale part of those names, everything before the hash
+
+
+def source_hash(name):
+    if name not in source_hashes:
+        with open(os.path.join(IMG_PATH, name), 'rb') as f:
+            source_hashes[name] = hashlib.sha1(f.read()).hexdigest()[:16]
+    return source_hashes[name]
+
+
+def cache_path(name, scale):
+    # BMP keeps the alpha channel and loads much faster than PNG, which matters more here than file size
+    return os.path.join(CACHE_PATH, os.path.splitext(name)[0] + "_" + str(scale) + "_" + source_hash(name) + ".bmp")
+
+
+def list_cache():
+    global baked_files
+    try:
+        baked_files = set(os.listdir(CACHE_PATH))
+    except OSError:
+        baked_files = set([])  # Nothing has been baked
+    for file in baked_files:
+        baked_scales.add(file.rsplit("_", 1)[0])
+
+
+def find(name, scale):
+    """ Load the baked copy of this image file at this scale, or None if it hasn't been baked (since it last changed) """
+    if baked_files is None:
+        list_cache()
+    # Checked before hashing, so images that were never baked at this scale cost no file reads
+    if os.path.splitext(name)[0] + "_" + str(scale) not in baked_scales:
+        return None
+    try:
+        path = cache_path(name, scale)
+    except OSError:
+        return None
+    if os.path.basename(path) not in baked_files:
+        return None
+    return pygame.image.load(path).convert_alpha()
+
+
+def is_number(node):
+    return isinstance(node, ast.Constant) and type(node.value) in (int, float)
+
+
+def image_constant(node):
+    """ Name of the assets.IMG_ constant this expression is, if it is one """
+    if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == "assets" \
+            and node.attr.startswith("IMG_"):
+        return node.attr
+    return None
+
+
+def image_table(tree):
+    """ The IMAGES table in assets.py: constant name -> (file, scale) """
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == "IMAGES" for t in node.targets):
+            return ast.literal_eval(node.value)
+    return {}
+
+
+def scaling_classes(tree):
+    """ Classes that scale an image parameter by a fixed amount in __init__: class name -> (parameter index, scale) """
+    classes = {}
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.ClassDef):
+            continue
+        for method in node.body:
+            if not isinstance(method, ast.FunctionDef) or method.name != "__init__":
+                continue
+            params = [arg.arg for arg in method.args.args[1:]]
+            for call in ast.walk(method):
+                if isinstance(call, ast.Call) and isinstance(call.func, ast.Attribute) and call.func.attr == "scaled" \
+                        and len(call.args) == 2 and isinstance(call.args[0], ast.Name) \
+                        and call.args[0].id in params and is_number(call.args[1]):
+                    classes[node.name] = (params.index(call.args[0].id), call.args[1].value)
+    return classes
+
+
+def find_scales():
+    """ Every (image file, scale) the game scales an image constant to, read from the source """
+    trees = []
+    for source in SOURCES:
+        with open(source) as f:
+            trees.append(ast.parse(f.read(), source))
+
+    table = {}
+    classes = {}
+    for tree in trees:
+        table.update(image_table(tree))
+        classes.update(scaling_classes(tree))
+
+    uses = set([])  # (constant, scale)
+    for tree in trees:
+        for node in ast.walk(tree):
+            if not isinstance(node, ast.Call):
+                continue
+            if isinstance(node.func, ast.Name) and node.func.id in classes:
+                # The number after the image is something else, like an item's count
+                index, scale = classes[node.func.id]
+                if index < len(node.args) and image_constant(node.args[index]) is not None:
+                    uses.add((image_constant(node.args[index]), scale))
+                continue
+            for i, arg in enumerate(node.args[:-1]):
+                constant = image_constant(arg)
+                if constant is not None and is_number(node.args[i + 1]) and node.args[i + 1].value > 0:
+                    uses.add((constant, node.args[i + 1].value))
+
+    scales = set([])
+    for constant, scale in uses:
+        # Constants scaled in the table are already copies, which the game scales again itself
+        if constant in table and table[constant][1] == 1 and scale != 1:
+            scales.add((table[constant][0], scale))
+    for file, scale in table.values():
+        if scale != 1:
+            scales.add((file, scale))
+    return sorted(scales)
+
+
+def build():
+    os.makedirs(CACHE_PATH, exist_ok=True)
+    baked = set([])
+    for name, scale in find_scales():
+        path = cache_path(name, scale)
+        baked.add(os.path.basename(path))
+        if not os.path.exists(path):
+            image = pygame.image.load(os.path.join(IMG_PATH, name)).convert_alpha()
+            pygame.image.save(util.scale_image(image, scale), path)
+
+    # Remove copies of images that have changed since, and of scales that aren't used anymore
+    for file in os.listdir(CACHE_PATH):
+        if file not in baked:
+            os.remove(os.path.join(CACHE_PATH, file))
+
+    print("Baked " + str(len(baked)) + " scaled images in " + CACHE_PATH)
+
+
+if __name__ == "__main__":
+    os.environ["SDL_VIDEODRIVER"] = "dummy"  # Converting images needs a display mode, but not a window
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    build()
@@ -0,0 +1,6 @@
+"""
+Performance benchmarks. Run them from the repository root, e.g.:
+    python -m benchmarks.scenarios
+    python benchmarks/vec_alloc.py
+    python benchmarks/separation.py
+"""
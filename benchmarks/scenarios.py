@@ -0,0 +1,286 @@
+"""
+Reproducible benchmark scenarios, each built from the game's own factories and run headless.
+
+Every scenario starts a new game with a fixed seed, sets up its world, and then runs a fixed number of ticks
+(simulation, depth sort and render). It reports how long each phase took and how much memory it allocated.
+The results are saved as JSON so runs from different commits can be diffed.
+
+Run from the repository root:
+    python -m benchmarks.scenarios
+    python -m benchmarks.scenarios --ticks 300 --only city_300_enemies --output city.json
+"""
+import os
+import sys
+import gc
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import headless  # Must come before main so the game opens no window
+import main as game
+import profiler
+import separation
+from globals import Globals
+from vector import Vec
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+TICKS = 600
+SEED = 1
+TOLERANCE = 1e-9  # How far the NumPy and plain Python separation forces may differ
+
+# Run in a fresh interpreter, so nothing has been imported or loaded yet
+FIRST_FRAME = """
+import time
+start = time.perf_counter()
+import headless
+import main
+main.new_game()
+main.render_world(main.window, main.overlay)
+main.window.blit(main.overlay, (0, 0))
+main.pygame.display.flip()
+print(time.perf_counter() - start)
+"""
+
+
+def around_player(min_dist, max_dist):
+    return game.player.pos + Vec.polar(random.randint(min_dist, max_dist), random.randint(0, 360))
+
+
+def crowd_world(troops=20):
+    """ A world of its own with the player in a crowd of trees, brawlers, rangers, troops and apples
+    Used by the microbenchmarks, which time single passes over it rather than running a scenario. Returns the world
+    and its troops """
+    world = game.World("Benchmark", Vec(3000, 3000), (0, 0, 0), (85, 175, 95))
+    game.current_world = game.frostland = world
+    game.player = game.Player("Player", game.assets.IMG_PLAYER_ALIVE, 0.28, 0.7, game.ALLY, 20)
+    world.add(world.size/2, game.player)
+
+    for i in range(12):
+        world.add(world.rand_pos(), game.new_tree())
+    for i in range(60):
+        world.add(world.size/2 + Vec.polar(random.randint(100, 900), random.randint(0, 360)), game.new_brawler())
+    for i in range(20):
+        world.add(world.size/2 + Vec.polar(random.randint(100, 900), random.randint(0, 360)), game.new_ranger())
+    crowd_troops = []
+    for i in range(troops):
+        pos = world.size/2 + Vec.polar(random.randint(50, 400), random.randint(0, 360))
+        crowd_troops.append(game.new_troop())
+        world.add(pos, crowd_troops[-1])
+    for i in range(20):
+        world.add(world.rand_pos(), game.new_apple_item())
+    return world, crowd_troops
+
+
+def overworld_idle():
+    """ The first world as a new game starts, with nobody fighting """
+    return None
+
+
+def city_300_enemies():
+    """ The City with 300 extra enemies of every kind scattered around it """
+    world = headless.enter_world(game, "City")
+    factories = (game.new_brawler, game.new_ranger, game.new_boomer, game.new_car, game.new_zoomer)
+    for i in range(300):
+        world.add(world.rand_pos(), random.choice(factories)())
+    return None
+
+
+def frostland_freeze_storm():
+    """ Frostland with coolers, freezers and troops trading freeze ray shots around a player firing one nonstop """
+    world = headless.enter_world(game, "Frostland")
+    for i in range(40):
+        world.add(around_player(300, 900), game.new_cooler())
+    for i in range(10):
+        world.add(around_player(400, 900), game.new_freezer())
+    for i in range(30):
+        world.add(around_player(50, 300), game.new_troop())
+
+    def fire(tick):
+        if tick % 6 == 0 and game.player.health > 0:
+            game.freeze_ray_shot(world, game.player, game.ALLY, Vec.polar(1, tick * 7))
+    return fire
+
+
+def space_station_spawners_maxed():
+    """ The Space Station with every spawner filled to its limit, and refilled as soon as anything dies """
+    world = headless.enter_world(game, "Space Station")
+    for s in world.spawners:
+        while len(s.spawned) < s.spawn_limit:
+            s.spawn(world)
+
+    def refill(tick):
+        for s in world.spawners:
+            s.time = s.interval
+    return refill
+
+
+SCENARIOS = {
+    "overworld_idle": overworld_idle,
+    "city_300_enemies": city_300_enemies,
+    "frostland_freeze_storm": frostland_freeze_storm,
+    "space_station_spawners_maxed": space_station_spawners_maxed,
+}
+
+
+def start(scenario, seed):
+    random.seed(seed)
+    game.new_game()
+    Globals.delta_time = headless.DELTA_TIME
+    return SCENARIOS[scenario]()
+
+
+def tick(n, action):
+    if action is not None:
+        action(n)
+    game.update_world()
+    game.current_world.sort_by_depth()
+    profiler.lap("sort")
+    game.render_world(game.window, game.overlay)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def time_scenario(scenario, ticks, seed):
+    action = start(scenario, seed)
+    profiler.skip_frame()  # Setup isn't part of any tick
+
+    frames = []
+    tick_times = []
+    gc_before = [stats["collections"] for stats in gc.get_stats()]
+    for n in range(ticks):
+        tick_start = time.perf_counter()
+        tick(n, action)
+        tick_times.append(time.perf_counter() - tick_start)
+        frames.append(profiler.end_frame())
+    gc_after = [stats["collections"] for stats in gc.get_stats()]
+    check_separation(game.current_world)  # After the ticks, once there are corpses, frozen AI and crowds to check
+
+    phases = {}
+    # Phases like event handling and the HUD only happen in the interactive loop
+    measured = [phase for phase in profiler.PHASES if any(phase in frame for frame in frames)]
+    for phase in measured + ["other"]:
+        if phase == "other":
+            times = [total - sum(frame.values()) for total, frame in zip(tick_times, frames)]
+        else:
+            times = [frame.get(phase, 0) for frame in frames]
+        phases[phase] = {
+            "total_ms": sum(times) * 1000,
+            "mean_ms": sum(times) / ticks * 1000,
+            "p95_ms": percentile(times, 0.95) * 1000,
+            "max_ms": max(times) * 1000,
+        }
+
+    return {
+        "description": SCENARIOS[scenario].__doc__.strip(),
+        "world": game.current_world.name,
+        "ticks_per_sec": ticks / sum(tick_times),
+        "entities_end": len(game.current_world.entities),
+        "phases": phases,
+        "gc_collections": [after - before for before, after in zip(gc_before, gc_after)],
+    }
+
+
+def check_separation(world):
+    """ Fail if the NumPy and plain Python separation forces disagree on this world, since only one of them is timed """
+    sources = [e for e in world.entities if isinstance(e, game.AIEntity)]
+    if np is None or not sources:
+        return
+    numpy_forces = separation.spread_forces_numpy(sources, world.entities)
+    python_forces = separation.spread_forces_python(sources, world.entities)
+    assert len(numpy_forces) == len(python_forces)
+    for e, (x, y), (px, py) in zip(sources, numpy_forces, python_forces):
+        assert abs(x - px) <= TOLERANCE and abs(y - py) <= TOLERANCE, \
+            "separation forces on {name} differ: {numpy} with NumPy, {python} without".format(
+                name=e.name, numpy=(x, y), python=(px, py))
+
+
+def measure_allocations(scenario, ticks, seed):
+    # Run it again from the same seed with tracemalloc on, since tracing slows everything down too much to time
+    action = start(scenario, seed)
+    tracemalloc.start()
+    start_size, start_peak = tracemalloc.get_traced_memory()
+    for n in range(ticks):
+        tick(n, action)
+    end_size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    profiler.skip_frame()
+    return {
+        "net_kib": (end_size - start_size) / 1024,
+        "peak_kib": (peak - start_size) / 1024,
+    }
+
+
+def time_to_first_frame():
+    """ Milliseconds from starting to import the game to its first frame being shown """
+    output = subprocess.check_output([sys.executable, "-c", FIRST_FRAME], cwd=ROOT)
+    return float(output.decode().split()[-1]) * 1000
+
+
+def commit_id():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the benchmark scenarios and save the results as JSON.")
+    parser.add_argument("--ticks", type=int, default=TICKS, help="ticks to run each scenario for")
+    parser.add_argument("--seed", type=int, default=SEED, help="random seed every scenario starts from")
+    parser.add_argument("--only", nargs="+", choices=sorted(SCENARIOS), help="scenarios to run (default: all)")
+    parser.add_argument("--no-alloc", action="store_true", help="skip the (slow) allocation measurement pass")
+    parser.add_argument("--output", default=None, help="JSON file to write (default: benchmarks/results/<commit>.json)")
+    args = parser.parse_args(argv)
+
+    commit = commit_id()
+    results = {
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np is not None,
+        "ticks": args.ticks,
+        "seed": args.seed,
+        "delta_time": headless.DELTA_TIME,
+        "time_to_first_frame_ms": time_to_first_frame(),
+        "scenarios": {},
+    }
+    print("Time to first frame: {ms:.0f} ms".format(ms=results["time_to_first_frame_ms"]))
+
+    for scenario in args.only or SCENARIOS:
+        result = time_scenario(scenario, args.ticks, args.seed)
+        if not args.no_alloc:
+            result["allocations"] = measure_allocations(scenario, args.ticks, args.seed)
+        results["scenarios"][scenario] = result
+
+        phases = ", ".join("{name} {mean_ms:.2f}".format(name=name, **phase) for name, phase in result["phases"].items())
+        print("{scenario}: {ticks_per_sec:.1f} ticks/sec, {entities_end} entities".format(scenario=scenario, **result))
+        print("    mean ms per tick: " + phases)
+        if "allocations" in result:
+            print("    allocated: {net_kib:.0f} KiB net, {peak_kib:.0f} KiB peak".format(**result["allocations"]))
+
+    output = args.output
+    if output is None:
+        output = os.path.join(ROOT, "benchmarks", "results", (commit or "latest") + ".json")
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print("Saved results to " + output)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
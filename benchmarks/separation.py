@@ -0,0 +1,86 @@
+"""
+Checks that the batched separation forces match the per-entity loop they replaced, then times all three.
+
+Builds a seeded crowd from the game's factories (teammates, enemies, dead allies, neutral trees and items,
+and a few entities stacked on the same spot) and compares spread_forces_numpy and spread_forces_python
+against the old loop, which filtered world.entities with can_spread and accelerated by a Vec per neighbor.
+
+Run from the repository root:
+    python benchmarks/separation.py
+"""
+import os
+import sys
+import random
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from benchmarks import scenarios
+from main import *
+import separation
+
+SEED = 1
+TOLERANCE = 1e-9
+REPEATS = 20
+
+
+def build_world():
+    world, troops = scenarios.crowd_world(troops=30)
+    # Dead teammates are skipped, and entities on the exact same spot push each other nowhere
+    for troop in troops[:5]:
+        troop.health = 0
+    for i in range(3):
+        world.add(world.size/2, new_troop())
+    return world
+
+
+def can_spread(e, other):
+    return e is not other and ((e.team is other.team and other.health > 0 and e.in_range(other)) or other.team == NEUTRAL)
+
+
+def old_spread_forces(sources, entities):
+    """ The loop AIEntity.spread used to run for each AI """
+    forces = []
+    for e in sources:
+        force = Vec(0, 0)
+        for other in filter(lambda other: can_spread(e, other), entities):
+            dir = e.pos - other.pos
+            spread_speed = 1 / (dir.mag() + 0.2)
+            force += dir.norm() * spread_speed
+        forces.append((force.x, force.y))
+    return forces
+
+
+def check(name, forces, expected):
+    assert len(forces) == len(expected), name + " returned " + str(len(forces)) + " forces, not " + str(len(expected))
+    worst = max((max(abs(x - ex), abs(y - ey)) for (x, y), (ex, ey) in zip(forces, expected)), default=0)
+    assert worst <= TOLERANCE, name + " is off by " + str(worst)
+    print("{name}: matches, largest difference {worst:.2e}".format(name=name, worst=worst))
+
+
+def timed(func, sources, entities):
+    start = time.perf_counter()
+    for i in range(REPEATS):
+        func(sources, entities)
+    return (time.perf_counter() - start) / REPEATS * 1000
+
+
+if __name__ == "__main__":
+    random.seed(SEED)
+    world = build_world()
+    sources = [e for e in world.entities if isinstance(e, AIEntity)]
+    print("{s} AI against {n} entities".format(s=len(sources), n=len(world.entities)))
+
+    expected = old_spread_forces(sources, world.entities)
+    check("spread_forces_python", separation.spread_forces_python(sources, world.entities), expected)
+    funcs = [("old loop", old_spread_forces), ("spread_forces_python", separation.spread_forces_python)]
+    if separation.np is not None:
+        check("spread_forces_numpy", separation.spread_forces_numpy(sources, world.entities), expected)
+        funcs.append(("spread_forces_numpy", separation.spread_forces_numpy))
+    else:
+        print("NumPy isn't installed, skipped spread_forces_numpy")
+
+    for name, func in funcs:
+        print("{name}: {t:.2f} ms".format(name=name, t=timed(func, sources, world.entities)))
@@ -0,0 +1,52 @@
+"""
+Microbenchmark: how many Vec objects the entity hot paths create per frame.
+
+Run from the repository root:
+    python benchmarks/vec_alloc.py
+"""
+import os
+import sys
+import random
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from benchmarks import scenarios
+import main
+from main import *
+
+FRAMES = 300
+
+created = [0]
+vec_init = Vec.__init__
+
+def counting_init(self, x, y=None):
+    created[0] += 1
+    vec_init(self, x, y)
+
+
+def frame(world):
+    world.update_spread()
+    world.update_entities(main.player)
+    world.collide_entities()
+    for e in world.entities:
+        main.screen_pos(e.pos)
+
+
+if __name__ == "__main__":
+    random.seed(1)
+    Globals.delta_time = 16
+    world = scenarios.crowd_world()[0]
+
+    Vec.__init__ = counting_init
+    start = time.perf_counter()
+    for i in range(FRAMES):
+        frame(world)
+    elapsed = time.perf_counter() - start
+    Vec.__init__ = vec_init
+
+    print("entities at end: {n}".format(n=len(world.entities)))
+    print("Vec allocations per frame: {v:.0f}".format(v=created[0] / FRAMES))
+    print("ms per frame: {t:.2f}".format(t=elapsed / FRAMES * 1000))
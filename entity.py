@@ -1,505 +1,613 @@
-import pygame
-import math
-import random
-from vector import Vec
-import util
-from globals import Globals
-import assets
-
-
-ALLY = 0
-ENEMY = 1
-NEUTRAL = 2
-
-def opposes(self, other):
-    return ((self.team == ALLY and other.team == ENEMY) \
-            or (self.team == ENEMY and other.team == ALLY) \
-            or (self.team == ALLY and other.team == NEUTRAL)) \
-            and (not other.invincible or other.is_player)
-
-
-#  The number of damage done shows up when something is hit
-
-
-def spawn_dmg_indicator(text, pos, vel, time, color):
-
-
-    Entity.dmg_indicators.append({
-        "text": text,
-        "pos": Vec(pos),
-        "vel": Vec(vel),
-        "time": time,
-        "color": color,
-    })
-
-
-class Entity:
-    dmg_indicators = []
-
-    def __init__(self, name, image, image_scale=1, team=NEUTRAL, health=None, solid=False, hitbox_size=None,
-                 death_func=None, animate=False, lifetime=-1):
-        self.name = name
-        self.default_image = image
-        self.current_image = None
-        self.image_scale = image_scale
-        self.team = team
-
-        if health == None:
-            self.health = 100
-            self.invincible = True
-        else:
-            self.health = health
-            self.invincible = False
-        self.max_health = self.health
-        self.solid = solid
-        self.death_func = death_func # Callback to run after death
-        self.animate = animate
-
-        self.pos = Vec(0, 0)
-        self.vel = Vec(0, 0)
-        self.speed = 0
-        self.shake_timer = 0  # Timer to track how long to shake sprite
-        self.take_knockback = True # Whether to get pushed back when hurt
-        self.last_collisions = set([])
-
-        self.world = None
-        self.is_player = False
-        self.time = 0  # Total time alive in world
-        self.lifetime = lifetime  # The amount of time able to live before dying. The default value -1 means live forever
-
-        self.alive = True
-        self.frozen_timer = 0
-
-        default_image_size = Vec(image.get_size()) * image_scale
-
-        self.surface = pygame.Surface(default_image_size.tuple(), pygame.SRCALPHA, 32).convert_alpha()
-        # Size is the true hitbox size of the entity (doesn't affect image)
-        if hitbox_size is None:
-            # By default size contains the entire image
-            self.size = default_image_size
-        else:
-            # Override hitbox size to custom dimensions
-            self.size = Vec(hitbox_size)
-
-        self.image_size = Vec(image.get_size())
-        self.set_image(image)
-
-    def set_image(self, image):
-        size = Vec(image.get_size()) * self.image_scale
-        if self.current_image is not image or size is not Vec(self.image_size):
-            self.current_image = image
-            self.image_size = size
-            self.surface.fill((0, 0, 0, 0))
-            self.surface.blit(util.scale_image(image, self.image_scale), (0, 0))
-
-    def resize(self, scale_multiplier):
-        self.image_scale *= scale_multiplier
-        self.size *= scale_multiplier
-        self.surface = pygame.Surface(self.size.tuple(), pygame.SRCALPHA, 32).convert_alpha()
-        self.set_image(self.current_image)
-
-    def rotate(self, angle):
-        self.surface = pygame.transform.rotate(self.surface, angle)
-
-    def render(self, surface, overlay_surface, pos):
-        hitbox = self.get_hitbox()
-        hitbox.center = pos.tuple()
-
-        render_rect = hitbox.copy()
-        # Render image in center of hitbox
-        render_rect.x += (self.size.x - self.image_size.x)/2
-        render_rect.y += (self.size.y - self.image_size.y)/2
-
-        # Keep track of shaking and shake the image if needed
-        if self.shake_timer > 0 and not isinstance(self, Projectile):
-            shake_dist = 2
-            if True:  # not self.is_player:
-                render_rect.x += random.randint(-shake_dist, shake_dist)
-                render_rect.y += random.randint(-shake_dist, shake_dist)
-            self.shake_timer -= Globals.delta_time
-
-        if self.animate:
-            if random.randint(0, 5) == 0:
-                self.surface = pygame.transform.flip(self.surface, -1, 0)
-
-        surface.blit(self.surface, render_rect)
-
-        if self.frozen_timer > 0:
-            ice_cube_image = util.scale_image(assets.IMG_ICE_CUBE, self.image_scale + 0.1)
-            render_rect = hitbox.copy()
-            # Render image in center of hitbox
-            render_rect.x += (self.size.x - ice_cube_image.get_size()[0])/2
-            render_rect.y += (self.size.y - ice_cube_image.get_size()[1])/2
-
-            surface.blit(ice_cube_image, render_rect)
-
-        # Draw health bar
-        if self.is_player or not self.invincible:
-            if self.health < self.max_health:
-                if self.team == ALLY:
-                    fg_color = (80, 130, 255)
-                else:
-                    fg_color = (255, 0, 0)
-
-                if self.is_player and self.invincible:
-                    fg_color = (119, 143, 155)
-
-                pos = Vec(hitbox.centerx, render_rect.top - 13)
-                size = Vec(math.sqrt(self.max_health) * 9, 6)
-                data = self.health / self.max_health
-                util.draw_bar(surface, pos, size, data, fg_color, (0, 0, 0), center=True)
-
-        if Globals.debug_mode:  # Draw hitbox outlines in debug mode
-            pygame.draw.rect(surface, (255, 255, 255), hitbox, 2)
-
-    def update(self, world, player):
-        self.time += Globals.delta_time
-
-        if self.frozen_timer > 0:
-            self.frozen_timer -= Globals.delta_time
-            self.frozen_timer = max(self.frozen_timer, 0)
-
-        if self.vel.mag() > self.speed:
-            self.vel = self.vel.norm() * self.speed
-
-        if self.frozen_timer > 0:
-            self.vel *= 0.25  # Slow down when frozen
-
-        # Scale movement with time so lag doesn't actually slow you down
-        self.pos += self.vel * Globals.delta_time
-
-        # keep entity within world bounds (stays a "radius" length from wall) if it is able to move
-        # if the entity has 0 speed (doesn't move), then it was placed out of bounds intentionally
-        if self.speed != 0:
-            self.keep_in_bounds(world)
-
-         # If time exceeds the desired life time (not the default value -1), remove this entity.
-        if self.lifetime != -1:
-            if self.time > self.lifetime:
-                self.alive = False
-            else:
-                size = min(1, (self.lifetime - self.time)/125)
-                self.resize(size)
-
-
-    def keep_in_bounds(self, world):
-        self.pos.x = util.clamp(self.pos.x, self.size.x/2, world.size.x - self.size.x/2)
-        # Keep bottom pixels inside the world boundaries instead of the entire entity
-        # This simulates the depth of the entity, maintaining the illusion of 3D
-        self.pos.y = util.clamp(self.pos.y, -self.size.y/2 + 20, world.size.y - self.size.y/2)
-
-    def colliding(self, other):
-        return self.get_hitbox().colliderect(other.get_hitbox())
-
-    def collide(self, other, world):
-        if self.solid and not other.solid and not isinstance(other, Projectile):
-            bottom = self.pos.y + self.size.y/2
-            other_bottom = other.pos.y + other.size.y/2
-            # Keep base of other entity either above or below base of this entity
-            if other_bottom < bottom:
-                other.pos.y = min(other_bottom + 20, bottom) - other.size.y/2 - 20
-            else:
-                other.pos.y = max(other_bottom - 20, bottom) - other.size.y/2 + 20
-
-    def accel(self, a):
-        self.vel += a
-
-    def get_hitbox(self):
-        return util.rect_center(self.pos, self.size)
-
-    def hurt(self, amount, world):
-        if self.invincible:
-            spawn_dmg_indicator("Blocked", self.pos, self.vel + Vec(0, -2), 500, (255, 255, 255))
-
-        else:
-            self.health -= amount
-            self.health = max(0, self.health)
-            self.shake_timer = 150
-
-            text_color = (255, 255, 0)
-            if self.team == ALLY:
-                text_color = (255, 125, 125)
-
-            spawn_dmg_indicator(amount, self.pos, self.vel + Vec(0, -2), 500, text_color)
-
-        if self.health <= 0 and self.alive:
-            if self.death_func is not None:
-                self.death_func(self, world, self.team)
-            self.alive = False
-
-    def __str__(self):
-        return "{name} at {pos}".format(name=self.name, pos=self.pos)
-
-
-class Portal(Entity):
-    """ Sends the player to a desired world, position, or entity when interacted with (SPACE)"""
-
-    def __init__(self, name, image, image_scale, team=NEUTRAL, health=None, hover_message="",
-                 to_world=None, to_position=None, to_entity=None, solid=False,
-                hitbox_size=None, death_func=None):
-
-        super().__init__(name, image, image_scale, team, health, solid=solid, hitbox_size=hitbox_size, death_func=death_func)
-        self.hover_message = hover_message
-        self.to_world = to_world
-        self.to_position = to_position
-        self.to_entity = to_entity
-        self.touching_player = False
-
-    def destination_position(self):
-        if self.to_position is not None: # Go to position if specified
-            return self.to_position
-        elif self.to_entity is not None: # Go to entity's position if entity is specified
-            return Vec(self.to_entity.pos + Vec(0, self.to_entity.get_hitbox()[3] / 2))
-        return None
-
-    def destination_world(self):
-        if self.to_entity is not None: # Go to the entity's world if entity is specified
-            return self.to_entity.world
-        return self.to_world
-
-    def render(self, surface, overlay_surface, pos):
-        super().render(surface, overlay_surface, pos)
-        if self.touching_player:
-            util.write(overlay_surface, self.hover_message, assets.MAIN_FONT, 45,(Globals.SIZE/2) + Vec(0, 100),
-                       (255, 255, 255), center=True)
-
-    def update(self, world, player):
-        super().update(world, player)
-        self.touching_player = False
-
-    def collide(self, other, world):
-        super().collide(other, world)
-        if other.is_player:
-            self.touching_player = True
-
-
-
-class AIEntity(Entity):
-    def __init__(self, name, image, image_scale, speed, team, health, damage, sight_range, follow_weight, atk_interval, retreat_range,
-                 death_func=None, hitbox_size=None, atk_sound=None):
-        super().__init__(name, image, image_scale, team, health, solid=False, hitbox_size=hitbox_size, death_func=death_func)
-        self.speed = speed
-        self.damage = damage
-        self.sight_range = sight_range  # how far target entities can be spotted
-        self.follow_weight = follow_weight  # the rate to accelerate towards a target (lags behind when low)
-        self.atk_interval = atk_interval  # time between initiating attacks on a target (milliseconds)
-        self.atk_timer = 0
-        self.retreat_range = retreat_range  # how far to back up when recharging attack
-        # different sprites for different direction is optional
-        self.atk_sound = atk_sound
-        self.right_image = None
-        self.left_image = None
-        self.wandering = False
-
-    def render(self, surface, overlay_surface, pos):
-        if self.right_image is not None:
-
-            if abs(self.vel.x) > abs(self.vel.y):
-                if self.vel.x > 0:
-                    self.set_image(self.right_image)
-                else:
-                    self.set_image(self.left_image)
-            else:
-                self.set_image(self.default_image)
-
-        super().render(surface, overlay_surface, pos)
-
-    def in_range(self, other):
-        return Vec.dist(self.pos, other.pos) <= self.sight_range
-
-    def can_follow(self, other):
-        if other.is_player:
-            if other.current_image == assets.IMG_PLAYER_INVIS:
-                return False
-        return opposes(self, other) and self.in_range(other) and not (self.team == ALLY and other.team == NEUTRAL)
-
-    def can_spread(self, other):
-        return self is not other and ((self.team is other.team and other.health > 0 and self.in_range(other)) or other.team == NEUTRAL)
-
-    def wander(self, world):
-        if random.random() < 0.005:
-            self.wandering = not self.wandering
-            self.vel = Vec.polar(0.01, random.randint(0, 360))
-        if self.wandering:
-            self.accel(self.vel.norm() * 0.01)
-            pass
-        else:
-            self.vel *= 0.95
-        # Slightly gravitate towards center of world
-        center_dist = (world.size/2) - self.pos
-        self.accel(center_dist.norm() * (center_dist.mag() * 0.00001))
-
-    def spread(self, world):
-        # Spread away from same team to prevent overlapping sprites
-        spread = list(filter(self.can_spread, world.entities))
-        for other in spread:
-            dir = self.pos - other.pos
-            spread_speed = 1 / (dir.mag() + 0.2)  # Spread away more from closer entities
-            self.accel(dir.norm() * spread_speed)
-
-    def attack(self, target_direction, world):
-        self.accel(target_direction.norm() * self.follow_weight)
-
-    def retreat(self, target, target_direction):
-        # Keep at a certain radius target_direction from player
-        radius_pos = target.pos - target_direction.norm() * self.retreat_range
-        radius_dir = radius_pos - self.pos
-        magnitude = self.vel.mag() / self.speed + 0.5
-        self.accel(radius_dir.norm() * self.follow_weight * magnitude)
-
-    def update(self, world, player):
-        follow = list(filter(self.can_follow, world.entities))
-
-        if len(follow) > 0:
-            target = follow[0]
-            # approach player, but keep at distance until attack is charged
-            target_dir = target.pos - self.pos
-
-            if self.atk_timer > self.atk_interval + random.randint(-100, 100):
-                self.attack(target_dir, world)
-                self.atk_timer += Globals.delta_time
-
-                if self.atk_sound is not None:
-                    assets.play_sound(self.atk_sound, self.pos, player.pos)
-
-                if self.colliding(target):
-                    target.hurt(self.damage, world)
-                    if target.take_knockback:
-                        target.accel((target.pos - self.pos) * 0.001)
-                        # pygame.mixer.Sound.play(assets.random_hit_sfx())
-                    assets.play_sound(assets.random_hit_sfx(), self.pos, player.pos)
-                    self.atk_timer = 0
-            else:
-                self.retreat(target, target_dir)
-                self.atk_timer += Globals.delta_time
-        else:
-            self.atk_timer = self.atk_interval
-            self.wander(world)
-        self.spread(world)
-        super().update(world, player)
-
-
-class RangedAIEntity(AIEntity):
-    def __init__(self, name, image, image_scale, speed, team, health, damage, sight_range, follow_weight, atk_interval,
-                 retreat_range, weapon_func, death_func=None, hitbox_size=None):
-        super().__init__(name, image, image_scale, speed, team, health, damage, sight_range, follow_weight,
-                         atk_interval, retreat_range,
-                         death_func=death_func, hitbox_size=hitbox_size)
-        self.weapon_func = weapon_func
-
-    def attack(self, target_direction, world):
-        if self.frozen_timer <= 0:
-            self.weapon_func(world, self, self.team, target_direction)
-            self.atk_timer = 0
-
-    def retreat(self, target, target_direction):
-        # Keep at a certain radius target_direction from player
-        radius_pos = target.pos - target_direction.norm() * self.retreat_range
-        radius_dir = radius_pos - self.pos
-        magnitude = self.vel.mag() / self.speed + 0.5
-        self.accel(radius_dir.norm() * self.follow_weight * magnitude)
-
-
-class Projectile(Entity):
-    def __init__(self, name, image, image_scale, speed, team, health, damage, direction, Range, parent=None,
-                 blockable=True, rotate=True, death_func=None, collide_func=None, hitbox_size=None, lifetime=-1):
-
-        super().__init__(name, image, image_scale, team, health, death_func=death_func, hitbox_size=hitbox_size, lifetime=lifetime)
-        self.speed = speed
-        self.damage = damage
-        self.vel = direction.norm() * self.speed
-        self.range = Range
-        if rotate:
-            self.rotate(self.vel.angle())
-        self.blockable = blockable
-        self.collide_func = collide_func
-
-        self.parent = parent
-        if self.parent is None:
-            self.init_vel = Vec(0, 0)
-        else:
-            if self.parent.is_player:
-                self.damage *= self.parent.damage_multiplier
-            self.init_vel = parent.vel  # Transfer parent velocity to the projectile
-        self.vel += self.init_vel
-        self.distance = 0
-
-    def update(self, world, player):
-        super().update(world, player)
-        # accumulate the change in position to get total distance
-        relative_vel = self.vel - self.init_vel
-        self.distance += abs(relative_vel.mag() * Globals.delta_time)
-
-        # hits border if within "radius" length.
-        ground_size = world.size/2
-        x, y = self.pos.x, self.pos.y
-        w, h = self.size.x, self.size.y
-
-        # wall_dist > 0 when outer edge of sprite is outside world border
-        hits_border = world.solid_border and \
-                    (x <= w/2 or x >= world.size.x - w/2
-                     or y <= h/2 - 100 or y >= world.size.y - h/2)
-
-        if (self.distance > self.range or hits_border) and self.time > 50:
-            if self.death_func is not None and self.alive:
-                self.death_func(self, world, self.team)
-            self.alive = False
-
-    def keep_in_bounds(self, world):
-        pass
-
-    def collide(self, other, world):
-        super().collide(other, world)
-        opposed = opposes(self, other)
-
-        if other not in self.last_collisions:
-            # Free allies from ice when shooting them
-            if not opposed and other.frozen_timer > 0 and other is not self.parent:
-                other.frozen_timer = 0
-                other.shake_timer = 150
-            if opposed or other.solid:
-                other.shake_timer = 150
-                if opposed:
-                    if self.collide_func is not None:
-                        self.collide_func(self, other)
-                    damage = self.damage
-                    if other.is_player:
-                        assets.play_sound(assets.SFX_OW_PLAYER, self.pos, other.pos)
-                        if other.invincible:
-                            self.alive = False # Remove if deflected by metalsuit invincibility powerup
-                    other.hurt(damage, world)
-
-                if other.take_knockback:
-                    other.accel(self.vel.norm() * 1)
-                if self.blockable:
-                    if self.death_func is not None:
-                        self.death_func(self, world, self.team)
-                    self.alive = False
-
-
-class ItemEntity(Entity):
-    def __init__(self, name, image, image_scale, collide_func, condition=None):
-        super().__init__(name, image, image_scale)
-        self.collide_func = collide_func # Callback function to run when the player collides
-        self.condition = condition # Boolean function that must be true to collect the item
-        self.speed = 0.3
-
-    def update(self, world, player):
-        super().update(world, player)
-        avoid_player = (self.pos - player.pos).norm() # make items move away from player
-        trend_toward_center = (world.size/2 - self.pos).norm()
-        # Bob up and down to indicate that this is a pickup
-        freq = 0.005
-        amp = 0.05
-        bobbing = Vec(0, math.sin(self.time * freq) * amp)
-        self.vel = bobbing
-
-    def collide(self, other, world):
-        super().collide(other, world)
-        if other.is_player:
-            collect = True
-            if self.condition is not None:
-                collect = self.condition()
-            if collect:
-                self.collide_func()
-                self.alive = False
+import pygame
+import math
+import random
+from vector import Vec
+import util
+from globals import Globals
+import assets
+import render_queue
+
+
+ALLY = 0
+ENEMY = 1
+NEUTRAL = 2
+
+# Entities with a lifetime shrink out in this many steps, so every instance can share the same few scaled images
+SHRINK_LEVELS = 8
+
+# The teams that AI on each team will go after
+TARGETS = {
+    ALLY: (ENEMY,),
+    ENEMY: (ALLY,),
+    NEUTRAL: (),
+}
+
+def opposes(self, other):
+    return ((self.team == ALLY and other.team == ENEMY) \
+            or (self.team == ENEMY and other.team == ALLY) \
+            or (self.team == ALLY and other.team == NEUTRAL)) \
+            and (not other.invincible or other.is_player)
+
+
+#  The number of damage done shows up when something is hit
+
+
+def spawn_dmg_indicator(world, text, pos, vel, time, color):
+    if not isinstance(text, str):
+        text = "{amount:g}".format(amount=text)
+    world.particles.emit_text(pos, vel, time, text, color)
+
+
+class Entity:
+    def __init__(self, name, image, image_scale=1, team=NEUTRAL, health=None, solid=False, hitbox_size=None,
+                 death_func=None, animate=False, lifetime=-1):
+        # Kept for the entity's whole life, even when it's recycled by pool.acquire: reset writes into them
+        self.pos = Vec(0, 0)
+        self.prev_pos = Vec(0, 0)  # Position before the last simulation step, for drawing in between steps
+        self.vel = Vec(0, 0)
+        self.size = Vec(0, 0)
+        self.full_size = Vec(0, 0)
+        self.image_size = Vec(0, 0)
+        self.hitbox = pygame.Rect(0, 0, 0, 0)  # Only refreshed when pos or size changes
+        self.last_collisions = set([])
+
+        Entity.reset(self, name, image, image_scale, team, health, solid, hitbox_size, death_func, animate, lifetime)
+
+    def reset(self, name, image, image_scale=1, team=NEUTRAL, health=None, solid=False, hitbox_size=None,
+              death_func=None, animate=False, lifetime=-1):
+        """ Set every field up like a new entity's, reusing the Vecs, Rect and set it already has """
+        self.name = name
+        self.default_image = image
+        self.current_image = None
+        self.image_scale = image_scale
+        self.team = team
+
+        if health == None:
+            self.health = 100
+            self.invincible = True
+        else:
+            self.health = health
+            self.invincible = False
+        self.max_health = self.health
+        self.solid = solid
+        self.death_func = death_func # Callback to run after death
+        self.animate = animate
+
+        self.pos.set(0, 0)
+        self.prev_pos.set(0, 0)
+        self.vel.set(0, 0)
+        self.speed = 0
+        self.shake_timer = 0  # Timer to track how long to shake sprite
+        self.take_knockback = True # Whether to get pushed back when hurt
+        self.last_collisions.clear()
+
+        self.world = None
+        self.spawner = None  # The spawner that made this entity, if any
+        self.pool_key = None  # Set for entities from pool.acquire, which get recycled once removed from their world
+        self.is_player = False
+        self.time = 0  # Total time alive in world
+        self.lifetime = lifetime  # The amount of time able to live before dying. The default value -1 means live forever
+
+        self.alive = True
+        self.frozen_timer = 0
+
+        # The surface comes from the shared scaled image cache, so it must never be drawn onto
+        self.surface = None
+        self.current_scale = None
+        self.angle = 0
+        # Size is the true hitbox size of the entity (doesn't affect image)
+        if hitbox_size is None:
+            # By default size contains the entire image
+            width, height = image.get_size()
+            self.size.set(width * image_scale, height * image_scale)
+        else:
+            # Override hitbox size to custom dimensions
+            self.size.set(hitbox_size)
+
+        # Full scale and size to shrink from at the end of the entity's lifetime
+        self.full_scale = image_scale
+        self.full_size.set(self.size)
+        self.shrink_level = 1
+
+        self.set_image(image)
+        self.sync_hitbox()
+
+    def set_image(self, image):
+        if self.current_image is not image or self.current_scale != self.image_scale:
+            self.current_image = image
+            self.current_scale = self.image_scale
+            self.surface = assets.scaled(image, self.image_scale)
+            self.image_size.set(self.surface.get_size())
+            if self.angle != 0:
+                self.surface = assets.rotated(self.surface, self.angle)
+
+    def resize(self, scale_multiplier):
+        self.image_scale *= scale_multiplier
+        self.size *= scale_multiplier
+        self.full_scale *= scale_multiplier
+        self.full_size *= scale_multiplier
+        self.set_image(self.current_image)
+        self.sync_hitbox()
+
+    def shrink(self, amount):
+        # Shrink to a fraction of full size, rounded up to the nearest of the shared shrink levels
+        level = math.ceil(amount * SHRINK_LEVELS) / SHRINK_LEVELS
+        if level != self.shrink_level:
+            self.shrink_level = level
+            self.image_scale = self.full_scale * level
+            self.size.set(self.full_size.x * level, self.full_size.y * level)
+            self.set_image(self.current_image)
+            self.sync_hitbox()
+
+    def rotate(self, angle):
+        self.angle = (self.angle + angle) % 360
+        self.surface = assets.rotated(assets.scaled(self.current_image, self.image_scale), self.angle)
+
+    def render(self, surface, overlay_surface, pos):
+        # Render image in center of hitbox
+        x = pos.x - self.image_size.x/2
+        y = pos.y - self.image_size.y/2
+
+        # Shake the image if needed
+        if self.shake_timer > 0 and not isinstance(self, Projectile):
+            shake_dist = 2
+            if True:  # not self.is_player:
+                x += random.randint(-shake_dist, shake_dist)
+                y += random.randint(-shake_dist, shake_dist)
+
+        if self.animate:
+            if random.randint(0, 5) == 0:
+                self.surface = pygame.transform.flip(self.surface, -1, 0)
+
+        render_queue.blit(self.surface, (x, y))
+        top = y
+
+        if self.frozen_timer > 0:
+            ice_cube_image = assets.scaled(assets.IMG_ICE_CUBE, self.image_scale + 0.1)
+            # Render image in center of hitbox
+            ice_x = pos.x - ice_cube_image.get_width()/2
+            ice_y = pos.y - ice_cube_image.get_height()/2
+
+            render_queue.blit(ice_cube_image, (ice_x, ice_y))
+            top = ice_y
+
+        # Draw health bar
+        if self.is_player or not self.invincible:
+            if self.health < self.max_health:
+                if self.team == ALLY:
+                    fg_color = (80, 130, 255)
+                else:
+                    fg_color = (255, 0, 0)
+
+                if self.is_player and self.invincible:
+                    fg_color = (119, 143, 155)
+
+                bar_pos = Vec(pos.x, top - 13)
+                size = Vec(math.sqrt(self.max_health) * 9, 6)
+                data = self.health / self.max_health
+                render_queue.bar(bar_pos, size, data, fg_color, (0, 0, 0), center=True)
+
+        if Globals.debug_mode:  # Draw hitbox outlines in debug mode
+            screen_hitbox = self.hitbox.move(pos.x - self.pos.x, pos.y - self.pos.y)
+            render_queue.outline((255, 255, 255), screen_hitbox, 2)
+
+    def interpolated_pos(self, alpha):
+        """ Get the position alpha (0 to 1) of the way from the previous simulation step to the current one """
+        return Vec(self.prev_pos.x + (self.pos.x - self.prev_pos.x) * alpha,
+                   self.prev_pos.y + (self.pos.y - self.prev_pos.y) * alpha)
+
+    def render_bounds(self):
+        """ Get the area of the world that render can draw onto: the shaking sprite, ice cube, health bar and hitbox """
+        shake_dist = 2
+        bounds = self.hitbox.union((self.pos.x - self.image_size.x/2 - shake_dist, self.pos.y - self.image_size.y/2 - shake_dist,
+                                    self.surface.get_width() + shake_dist*2, self.surface.get_height() + shake_dist*2))
+        if self.frozen_timer > 0:
+            ice_cube_image = assets.scaled(assets.IMG_ICE_CUBE, self.image_scale + 0.1)
+            bounds.union_ip(ice_cube_image.get_rect(center=self.pos.tuple()))
+
+        # Health bar sits 13 pixels above the top of the sprite
+        bar_width = math.sqrt(self.max_health) * 9
+        bounds.union_ip((self.pos.x - bar_width/2, bounds.top - 16, bar_width, 16))
+        return bounds.inflate(2, 2)
+
+    def update(self, world, player):
+        self.time += Globals.delta_time
+
+        # Keep track of how long to keep shaking, even while off screen
+        if self.shake_timer > 0:
+            self.shake_timer -= Globals.delta_time
+
+        if self.frozen_timer > 0:
+            self.frozen_timer -= Globals.delta_time
+            self.frozen_timer = max(self.frozen_timer, 0)
+
+        if self.vel.mag2() > self.speed * self.speed:
+            self.vel.scale_to(self.speed)
+
+        if self.frozen_timer > 0:
+            self.vel *= 0.25  # Slow down when frozen
+
+        # Scale movement with time so lag doesn't actually slow you down
+        self.pos.add_scaled(self.vel, Globals.delta_time)
+
+        # keep entity within world bounds (stays a "radius" length from wall) if it is able to move
+        # if the entity has 0 speed (doesn't move), then it was placed out of bounds intentionally
+        if self.speed != 0:
+            self.keep_in_bounds(world)
+
+         # If time exceeds the desired life time (not the default value -1), remove this entity.
+        if self.lifetime != -1:
+            if self.time > self.lifetime:
+                self.alive = False
+            else:
+                self.shrink(min(1, (self.lifetime - self.time)/125))
+
+        self.moved()
+
+    def moved(self):
+        # Call after changing pos or size so the hitbox and the world's spatial indexes stay in sync
+        self.sync_hitbox()
+        if self.world is not None:
+            self.world.moved(self)
+
+    def sync_hitbox(self):
+        # Truncate like pygame.Rect's constructor does (assigning floats to rect attributes rounds instead)
+        self.hitbox.width = int(self.size.x)
+        self.hitbox.height = int(self.size.y)
+        self.hitbox.centerx = self.pos.x
+        self.hitbox.centery = self.pos.y
+        self.depth = self.pos.y + self.size.y/2  # Entities are drawn from lowest to highest base
+
+
+    def keep_in_bounds(self, world):
+        self.pos.x = util.clamp(self.pos.x, self.size.x/2, world.size.x - self.size.x/2)
+        # Keep bottom pixels inside the world boundaries instead of the entire entity
+        # This simulates the depth of the entity, maintaining the illusion of 3D
+        self.pos.y = util.clamp(self.pos.y, -self.size.y/2 + 20, world.size.y - self.size.y/2)
+
+    def colliding(self, other):
+        return self.hitbox.colliderect(other.hitbox)
+
+    def collide(self, other, world):
+        if self.solid and not other.solid and not isinstance(other, Projectile):
+            bottom = self.pos.y + self.size.y/2
+            other_bottom = other.pos.y + other.size.y/2
+            # Keep base of other entity either above or below base of this entity
+            if other_bottom < bottom:
+                other.pos.y = min(other_bottom + 20, bottom) - other.size.y/2 - 20
+            else:
+                other.pos.y = max(other_bottom - 20, bottom) - other.size.y/2 + 20
+            other.moved()
+
+    def accel(self, a):
+        self.vel += a
+
+    def get_hitbox(self):
+        return self.hitbox
+
+    def hurt(self, amount, world):
+        if self.invincible:
+            spawn_dmg_indicator(world, "Blocked", self.pos, self.vel + Vec(0, -0.1), 500, (255, 255, 255))
+
+        else:
+            self.health -= amount
+            self.health = max(0, self.health)
+            self.shake_timer = 150
+
+            text_color = (255, 255, 0)
+            if self.team == ALLY:
+                text_color = (255, 125, 125)
+
+            spawn_dmg_indicator(world, amount, self.pos, self.vel + Vec(0, -0.1), 500, text_color)
+
+        if self.health <= 0 and self.alive:
+            if self.death_func is not None:
+                self.death_func(self, world, self.team)
+            self.alive = False
+
+    def __str__(self):
+        return "{name} at {pos}".format(name=self.name, pos=self.pos)
+
+
+class Portal(Entity):
+    """ Sends the player to a desired world, position, or entity when interacted with (SPACE)"""
+
+    def __init__(self, name, image, image_scale, team=NEUTRAL, health=None, hover_message="",
+                 to_world=None, to_position=None, to_entity=None, solid=False,
+                hitbox_size=None, death_func=None):
+
+        super().__init__(name, image, image_scale, team, health, solid=solid, hitbox_size=hitbox_size, death_func=death_func)
+        self.hover_message = hover_message
+        self.to_world = to_world
+        self.to_position = to_position
+        self.to_entity = to_entity
+        self.touching_player = False
+
+    def destination_position(self):
+        if self.to_position is not None: # Go to position if specified
+            return self.to_position
+        elif self.to_entity is not None: # Go to entity's position if entity is specified
+            return Vec(self.to_entity.pos + Vec(0, self.to_entity.get_hitbox()[3] / 2))
+        return None
+
+    def destination_world(self):
+        if self.to_entity is not None: # Go to the entity's world if entity is specified
+            return self.to_entity.world
+        return self.to_world
+
+    def render(self, surface, overlay_surface, pos):
+        super().render(surface, overlay_surface, pos)
+        if self.touching_player:
+            render_queue.mark(util.write(overlay_surface, self.hover_message, assets.MAIN_FONT, 45,(Globals.SIZE/2) + Vec(0, 100),
+                                         (255, 255, 255), center=True))
+
+    def update(self, world, player):
+        super().update(world, player)
+        self.touching_player = False
+
+    def collide(self, other, world):
+        super().collide(other, world)
+        if other.is_player:
+            self.touching_player = True
+
+
+
+class AIEntity(Entity):
+    def __init__(self, name, image, image_scale, speed, team, health, damage, sight_range, follow_weight, atk_interval, retreat_range,
+                 death_func=None, hitbox_size=None, atk_sound=None):
+        super().__init__(name, image, image_scale, team, health, solid=False, hitbox_size=hitbox_size, death_func=death_func)
+        self.speed = speed
+        self.damage = damage
+        self.sight_range = sight_range  # how far target entities can be spotted
+        self.follow_weight = follow_weight  # the rate to accelerate towards a target (lags behind when low)
+        self.atk_interval = atk_interval  # time between initiating attacks on a target (milliseconds)
+        self.atk_timer = 0
+        self.retreat_range = retreat_range  # how far to back up when recharging attack
+        # different sprites for different direction is optional
+        self.atk_sound = atk_sound
+        self.right_image = None
+        self.left_image = None
+        self.wandering = False
+        self.spread_force = Vec(0, 0)  # Set each frame by World.update_spread
+        self.think_time = 0  # Time since last thinking, for AI that doesn't think every step
+        self.think_phase = random.randint(0, 59)  # Keeps AI that thinks every few steps from all thinking on the same one
+        self.ai_tier = 0  # Set by World.schedule_ai, the last tier being too far to think
+
+    def render(self, surface, overlay_surface, pos):
+        if self.right_image is not None:
+
+            if abs(self.vel.x) > abs(self.vel.y):
+                if self.vel.x > 0:
+                    self.set_image(self.right_image)
+                else:
+                    self.set_image(self.left_image)
+            else:
+                self.set_image(self.default_image)
+
+        super().render(surface, overlay_surface, pos)
+
+    def in_range(self, other):
+        return self.pos.dist2(other.pos) <= self.sight_range * self.sight_range
+
+    def can_follow(self, other):
+        if other.is_player:
+            if other.current_image == assets.IMG_PLAYER_INVIS:
+                return False
+        return opposes(self, other) and self.in_range(other) and not (self.team == ALLY and other.team == NEUTRAL)
+
+    # The steering below is what one step of thinking does, times steps for AI that thinks less often
+
+    def wander(self, world, steps=1):
+        if random.random() < 0.005 * steps:
+            self.wandering = not self.wandering
+            self.vel = Vec.polar(0.01, random.randint(0, 360))
+        if self.wandering:
+            self.vel.add_scaled(self.vel.norm(), 0.01 * steps)
+        else:
+            self.vel *= 0.95 ** steps
+        # Slightly gravitate towards center of world
+        self.vel.x += (world.size.x/2 - self.pos.x) * 0.00001 * steps
+        self.vel.y += (world.size.y/2 - self.pos.y) * 0.00001 * steps
+
+    def spread(self, world, steps=1):
+        # Spread away from same team to prevent overlapping sprites
+        self.vel.add_scaled(self.spread_force, steps)
+
+    def attack(self, target_direction, world, steps=1):
+        self.vel.add_scaled(target_direction.norm(), self.follow_weight * steps)
+
+    def retreat(self, target, target_direction, steps=1):
+        # Keep at a certain radius target_direction from player
+        radius_dir = target_direction.norm()
+        radius_dir *= -self.retreat_range
+        radius_dir += target.pos
+        radius_dir -= self.pos
+        magnitude = self.vel.mag() / self.speed + 0.5
+        self.vel.add_scaled(radius_dir.normalize(), self.follow_weight * magnitude * steps)
+
+    def update(self, world, player, think=True):
+        self.think_time += Globals.delta_time
+        if think:
+            self.think(world, player, self.think_time)
+            self.think_time = 0
+        elif self.ai_tier == len(Globals.AI_TIERS):
+            # Too far away to look for targets or spread out, which is most of thinking, but it still wanders
+            # (and slows down when it stops wandering) instead of drifting off forever
+            self.atk_timer = self.atk_interval
+            self.wander(world, self.think_time / Globals.STEP)
+            self.think_time = 0
+        super().update(world, player)
+
+    def think(self, world, player, delta_time):
+        # Find a target and steer, with delta_time being the time since the last time this AI thought
+        target = world.nearest_opponent(self, self.sight_range, self.can_follow)
+        # Steering covers all the steps since then at once, which is close enough at a few steps apart
+        steps = delta_time / Globals.STEP
+
+        if target is not None:
+            # approach player, but keep at distance until attack is charged
+            target_dir = target.pos - self.pos
+
+            if self.atk_timer > self.atk_interval + random.randint(-100, 100):
+                self.attack(target_dir, world, steps)
+                self.atk_timer += delta_time
+
+                if self.atk_sound is not None:
+                    assets.play_sound(self.atk_sound, self.pos, player.pos)
+
+                if self.colliding(target):
+                    target.hurt(self.damage, world)
+                    if target.take_knockback:
+                        target.accel((target.pos - self.pos) * 0.001)
+                        # pygame.mixer.Sound.play(assets.random_hit_sfx())
+                    assets.play_sound(assets.random_hit_sfx(), self.pos, player.pos)
+                    self.atk_timer = 0
+            else:
+                self.retreat(target, target_dir, steps)
+                self.atk_timer += delta_time
+        else:
+            self.atk_timer = self.atk_interval
+            self.wander(world, steps)
+        self.spread(world, steps)
+
+
+class RangedAIEntity(AIEntity):
+    def __init__(self, name, image, image_scale, speed, team, health, damage, sight_range, follow_weight, atk_interval,
+                 retreat_range, weapon_func, death_func=None, hitbox_size=None):
+        super().__init__(name, image, image_scale, speed, team, health, damage, sight_range, follow_weight,
+                         atk_interval, retreat_range,
+                         death_func=death_func, hitbox_size=hitbox_size)
+        self.weapon_func = weapon_func
+
+    def attack(self, target_direction, world, steps=1):
+        # Fires once however long it's been
+        if self.frozen_timer <= 0:
+            self.weapon_func(world, self, self.team, target_direction)
+            self.atk_timer = 0
+
+    def retreat(self, target, target_direction, steps=1):
+        # Keep at a certain radius target_direction from player
+        radius_dir = target_direction.norm()
+        radius_dir *= -self.retreat_range
+        radius_dir += target.pos
+        radius_dir -= self.pos
+        magnitude = self.vel.mag() / self.speed + 0.5
+        self.vel.add_scaled(radius_dir.normalize(), self.follow_weight * magnitude * steps)
+
+
+class Projectile(Entity):
+    def __init__(self, name, image, image_scale, speed, team, health, damage, direction, Range, parent=None,
+                 blockable=True, rotate=True, death_func=None, collide_func=None, hitbox_size=None, lifetime=-1):
+
+        super().__init__(name, image, image_scale, team, health, death_func=death_func, hitbox_size=hitbox_size, lifetime=lifetime)
+        self.init_vel = Vec(0, 0)
+        self.reset_projectile(speed, damage, direction, Range, parent, blockable, rotate, collide_func)
+
+    def reset(self, name, image, image_scale, speed, team, health, damage, direction, Range, parent=None,
+              blockable=True, rotate=True, death_func=None, collide_func=None, hitbox_size=None, lifetime=-1):
+        super().reset(name, image, image_scale, team, health, death_func=death_func, hitbox_size=hitbox_size, lifetime=lifetime)
+        self.reset_projectile(speed, damage, direction, Range, parent, blockable, rotate, collide_func)
+
+    def reset_projectile(self, speed, damage, direction, Range, parent, blockable, rotate, collide_func):
+        self.speed = speed
+        self.damage = damage
+        self.vel.set(direction)
+        self.vel.scale_to(self.speed)
+        self.range = Range
+        if rotate:
+            self.rotate(self.vel.angle())
+        self.blockable = blockable
+        self.collide_func = collide_func
+
+        self.parent = parent
+        if self.parent is None:
+            self.init_vel.set(0, 0)
+        else:
+            if self.parent.is_player:
+                self.damage *= self.parent.damage_multiplier
+            self.init_vel.set(parent.vel)  # Transfer parent velocity to the projectile
+        self.vel += self.init_vel
+        self.distance = 0
+
+    def update(self, world, player):
+        super().update(world, player)
+        # accumulate the change in position to get total distance
+        relative_speed = math.hypot(self.vel.x - self.init_vel.x, self.vel.y - self.init_vel.y)
+        self.distance += abs(relative_speed * Globals.delta_time)
+
+        # hits border if within "radius" length.
+        x, y = self.pos.x, self.pos.y
+        w, h = self.size.x, self.size.y
+
+        # wall_dist > 0 when outer edge of sprite is outside world border
+        hits_border = world.solid_border and \
+                    (x <= w/2 or x >= world.size.x - w/2
+                     or y <= h/2 - 100 or y >= world.size.y - h/2)
+
+        if (self.distance > self.range or hits_border) and self.time > 50:
+            if self.death_func is not None and self.alive:
+                self.death_func(self, world, self.team)
+            self.alive = False
+
+    def keep_in_bounds(self, world):
+        pass
+
+    def collide(self, other, world):
+        super().collide(other, world)
+        opposed = opposes(self, other)
+
+        if other not in self.last_collisions:
+            # Free allies from ice when shooting them
+            if not opposed and other.frozen_timer > 0 and other is not self.parent:
+                other.frozen_timer = 0
+                other.shake_timer = 150
+            if opposed or other.solid:
+                other.shake_timer = 150
+                if opposed:
+                    if self.collide_func is not None:
+                        self.collide_func(self, other)
+                    damage = self.damage
+                    if other.is_player:
+                        assets.play_sound(assets.SFX_OW_PLAYER, self.pos, other.pos)
+                        if other.invincible:
+                            self.alive = False # Remove if deflected by metalsuit invincibility powerup
+                    other.hurt(damage, world)
+
+                if other.take_knockback:
+                    other.accel(self.vel.norm() * 1)
+                if self.blockable:
+                    if self.death_func is not None:
+                        self.death_func(self, world, self.team)
+                    self.alive = False
+
+
+class ItemEntity(Entity):
+    def __init__(self, name, image, image_scale, collide_func, condition=None):
+        super().__init__(name, image, image_scale)
+        self.reset_item(collide_func, condition)
+
+    def reset(self, name, image, image_scale, collide_func, condition=None):
+        super().reset(name, image, image_scale)
+        self.reset_item(collide_func, condition)
+
+    def reset_item(self, collide_func, condition):
+        self.collide_func = collide_func # Callback function to run when the player collides
+        self.condition = condition # Boolean function that must be true to collect the item
+        self.speed = 0.3
+
+    def update(self, world, player):
+        super().update(world, player)
+        # Bob up and down to indicate that this is a pickup
+        freq = 0.005
+        amp = 0.05
+        self.vel.set(0, math.sin(self.time * freq) * amp)
+
+    def collide(self, other, world):
+        super().collide(other, world)
+        if other.is_player:
+            collect = True
+            if self.condition is not None:
+                collect = self.condition()
+            if collect:
+                self.collide_func()
+                self.alive = False
@@ -1,12 +1,26 @@
-from vector import Vec
-
-
-class Globals:
-    SIZE = Vec(1400, 925)
-    delta_time = 0
-    cursor_img = None
-
-    FPS = 60
-    debug_mode = False
-
-    sound_on = False
+from vector import Vec
+
+
+class Globals:
+    SIZE = Vec(1400, 925)
+    delta_time = 0
+    cursor_img = None
+
+    FPS = 60
+    # The simulation always advances in fixed steps, however fast frames are rendered
+    # Accelerations are applied once per step, and were tuned at 60 per second
+    TICK_RATE = 60
+    STEP = 1000 / TICK_RATE  # Milliseconds per step
+    MAX_STEPS = 5  # Most steps to run in one frame, so a slow frame doesn't make the next one even slower
+
+    # AI off screen thinks less often the further it is from the player
+    # Each tier is (distance from the player, steps between thinking), from nearest to furthest
+    # Past the last tier's distance AI stops thinking and only wanders
+    AI_TIERS = ((1200, 1), (2400, 4))
+
+    # Only update the parts of the window that changed while the camera stands still, instead of all of it every frame
+    DIRTY_RECTS = False
+    PAUSED_WAIT = 250  # Longest the paused game sleeps waiting for input before checking again (milliseconds)
+    debug_mode = False
+
+    sound_on = False
@@ -0,0 +1,89 @@
+"""
+Runs the game's simulation without a window, sound or input, as fast as it can go.
+Every tick advances the current world by the same fixed delta time, so runs with the same seed do the same work.
+
+From the command line:
+    python headless.py --ticks 3000 --world City
+    python main.py --headless --ticks 3000
+
+Or as a library:
+    import headless
+    result = headless.run(3000, world="City")
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+# SDL reads these when pygame starts, so they have to be set before main is imported
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+from globals import Globals
+import profiler
+
+DELTA_TIME = Globals.STEP  # Milliseconds per tick, the same step the game simulates in
+
+
+def run(ticks=1000, delta_time=DELTA_TIME, world=None, seed=None, game=None):
+    """ Start a new game, simulate it for a number of ticks and return how long it took """
+    if game is None:
+        import main as game
+
+    if seed is not None:
+        random.seed(seed)
+    game.new_game()
+    if world is not None:
+        enter_world(game, world)
+
+    Globals.delta_time = delta_time
+    start = time.perf_counter()
+    for tick in range(ticks):
+        game.update_world()
+        profiler.skip_frame()  # Nothing reads the timings, so don't collect them
+    seconds = time.perf_counter() - start
+
+    return {
+        "world": game.current_world.name,
+        "ticks": ticks,
+        "delta_time": delta_time,
+        "seconds": seconds,
+        "ticks_per_sec": ticks / seconds if seconds > 0 else float("inf"),
+        "entities": len(game.current_world.entities),
+    }
+
+
+def enter_world(game, name):
+    # Move the player over directly, since set_world would also load the world's music
+    new_world = find_world(game, name)
+    game.current_world.remove(game.player)
+    game.current_world.compact()
+    new_world.add(new_world.size/2, game.player)
+    game.current_world = new_world
+    return new_world
+
+
+def find_world(game, name):
+    for w in game.worlds:
+        if w.name.lower() == name.lower():
+            return w
+    raise ValueError("No world named " + repr(name) + ", choose from: " + ", ".join(w.name for w in game.worlds))
+
+
+def main(argv=None, game=None):
+    parser = argparse.ArgumentParser(description="Simulate the game without a window and report ticks per second.")
+    parser.add_argument("--headless", action="store_true", help=argparse.SUPPRESS)  # Passed along by main.py
+    parser.add_argument("--ticks", type=int, default=1000, help="number of ticks to simulate")
+    parser.add_argument("--dt", type=float, default=DELTA_TIME, help="milliseconds per tick")
+    parser.add_argument("--world", default=None, help="name of the world to simulate (default: Overworld)")
+    parser.add_argument("--seed", type=int, default=None, help="random seed, for repeatable runs")
+    args = parser.parse_args(argv)
+
+    result = run(args.ticks, args.dt, args.world, args.seed, game)
+    print("{world}: {ticks} ticks in {seconds:.2f}s ({ticks_per_sec:.1f} ticks/sec), {entities} entities".format(**result))
+    return result
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
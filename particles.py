@@ -0,0 +1,174 @@
+import math
+import assets
+import util
+import render_queue
+from globals import Globals
+from vector import Vec
+from entity import SHRINK_LEVELS
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+"""
+Short-lived visual effects (damage numbers, poofs, blood) that don't need to be entities.
+Particles live in fixed-size arrays, are moved all at once and drawn in a single blits call.
+"""
+
+# Every surface a particle can show, shared by all worlds. A particle only stores the index into this list
+sprites = []
+# (id(image), scale, angle step) -> (image, sprite id)
+# The source image is kept in the entry so its id can't be reused by another image while the entry exists
+image_sprites = {}
+glyph_sprites = {}  # (character, color) -> sprite id
+shrunk_sprites = {}  # (sprite id, shrink level) -> Surface
+
+DMG_FONT_SIZE = 26
+
+
+def add_sprite(surface):
+    sprites.append(surface)
+    return len(sprites) - 1
+
+
+def sprite(image, scale=1, angle=0):
+    """ Get the sprite id for image scaled by scale and rotated by angle (snapped like assets.rotated) """
+    step = round(angle * assets.ANGLE_STEPS / 360) % assets.ANGLE_STEPS
+    key = (id(image), scale, step)
+    if key not in image_sprites:
+        surface = assets.scaled(image, scale)
+        if step != 0:
+            surface = assets.rotated(surface, angle)
+        image_sprites[key] = (image, add_sprite(surface))
+    return image_sprites[key][1]
+
+
+def glyph_sprite(char, color):
+    """ Get the sprite id for one character in the main font """
+    key = (char, color)
+    if key not in glyph_sprites:
+        glyph_sprites[key] = add_sprite(util.render_text(char, assets.MAIN_FONT, DMG_FONT_SIZE, color))
+    return glyph_sprites[key]
+
+
+def shrunk_sprite(sprite_id, level):
+    key = (sprite_id, level)
+    if key not in shrunk_sprites:
+        shrunk_sprites[key] = assets.scaled(sprites[sprite_id], level / SHRINK_LEVELS)
+    return shrunk_sprites[key]
+
+
+class ParticleSystem:
+    def __init__(self, capacity=512):
+        self.capacity = capacity
+        self.count = 0  # Live particles are always packed into the first count slots
+
+        if np is not None:
+            def new_array(dtype=float):
+                return np.zeros(capacity, dtype=dtype)
+        else:
+            def new_array(dtype=float):
+                return [dtype(0)] * capacity
+
+        self.x = new_array()
+        self.y = new_array()
+        self.vel_x = new_array()
+        self.vel_y = new_array()
+        self.ttl = new_array()  # Time left to live (milliseconds)
+        self.sprite = new_array(int)
+        self.shrink = new_array(bool)  # Whether to shrink away over the last 125 milliseconds, like entities with a lifetime
+
+    def emit(self, pos, vel, ttl, sprite_id, shrink=False):
+        if self.count < self.capacity:
+            i = self.count
+            self.count += 1
+        else:
+            # Full, so replace whichever particle is closest to disappearing anyway
+            ttl_left = self.ttl[:self.count]
+            i = int(np.argmin(ttl_left)) if np is not None else ttl_left.index(min(ttl_left))
+
+        self.x[i], self.y[i] = pos.x, pos.y
+        self.vel_x[i], self.vel_y[i] = vel.x, vel.y
+        self.ttl[i] = ttl
+        self.sprite[i] = sprite_id
+        self.shrink[i] = shrink
+
+    def emit_text(self, pos, vel, ttl, text, color):
+        # One particle per character, so damage numbers all share a few glyphs instead of every distinct
+        # number (which grows with the damage multiplier) keeping a sprite of its own for good
+        glyphs = [glyph_sprite(char, color) for char in text]
+        if self.count + len(glyphs) > self.capacity:
+            return  # Replacing particles would leave digits missing, and a number with half its digits is misleading
+        x = pos.x - sum(sprites[glyph].get_width() for glyph in glyphs) / 2
+        for glyph in glyphs:
+            width = sprites[glyph].get_width()
+            self.emit(Vec(x + width/2, pos.y), vel, ttl, glyph)
+            x += width
+
+    def update(self, delta_time):
+        n = self.count
+        if n == 0:
+            return
+
+        if np is not None:
+            self.x[:n] += self.vel_x[:n] * delta_time
+            self.y[:n] += self.vel_y[:n] * delta_time
+            self.ttl[:n] -= delta_time
+
+            alive = self.ttl[:n] > 0
+            if not alive.all():
+                # Pack the survivors back into the front of the arrays
+                count = int(alive.sum())
+                for array in (self.x, self.y, self.vel_x, self.vel_y, self.ttl, self.sprite, self.shrink):
+                    array[:count] = array[:n][alive]
+                self.count = count
+            return
+
+        count = 0
+        for i in range(n):
+            ttl = self.ttl[i] - delta_time
+            if ttl > 0:
+                for array in (self.x, self.y, self.vel_x, self.vel_y, self.sprite, self.shrink):
+                    array[count] = array[i]
+                self.x[count] += self.vel_x[i] * delta_time
+                self.y[count] += self.vel_y[i] * delta_time
+                self.ttl[count] = ttl
+                count += 1
+        self.count = count
+
+    def render(self, surface, pos):
+        # pos is where the world's top left corner is on the surface
+        n = self.count
+        if n == 0:
+            return
+
+        if np is not None:
+            xs = (self.x[:n] + pos.x).tolist()
+            ys = (self.y[:n] + pos.y).tolist()
+            levels = np.minimum(np.ceil(self.ttl[:n] / 125 * SHRINK_LEVELS), SHRINK_LEVELS).astype(int).tolist()
+            sprite_ids = self.sprite[:n].tolist()
+            shrinks = self.shrink[:n].tolist()
+        else:
+            xs = [x + pos.x for x in self.x[:n]]
+            ys = [y + pos.y for y in self.y[:n]]
+            levels = [min(math.ceil(ttl / 125 * SHRINK_LEVELS), SHRINK_LEVELS) for ttl in self.ttl[:n]]
+            sprite_ids = self.sprite[:n]
+            shrinks = self.shrink[:n]
+
+        width, height = surface.get_size()
+        batch = []
+        for x, y, sprite_id, shrink, level in zip(xs, ys, sprite_ids, shrinks, levels):
+            if shrink and level < SHRINK_LEVELS:
+                image = shrunk_sprite(sprite_id, level)
+            else:
+                image = sprites[sprite_id]
+            w, h = image.get_size()
+            left, top = x - w/2, y - h/2
+            if left < width and top < height and left + w > 0 and top + h > 0:  # Skip particles off screen
+                batch.append((image, (left, top)))
+        drawn = surface.blits(batch, Globals.DIRTY_RECTS)
+        if drawn:
+            for rect in drawn:
+                render_queue.mark(rect)
@@ -0,0 +1,42 @@
+"""
+Recycles entities that are created and thrown away constantly (projectiles, explosions, dropped items).
+Entities are pooled by class and name. A recycled entity's reset sets it up like its __init__ would, writing into
+the Vecs, Rect and sets it already has instead of allocating new ones.
+Entities are acquired in the factories that build them, since World.add gets them already built (and also moves
+the player and others between worlds). They're released when World.compact takes them out of the entity list.
+"""
+
+MAX_FREE = 256  # Most entities kept waiting in each pool
+
+pools = {}  # (class, name) -> list of released entities
+hits = 0  # Acquires that reused a released entity
+misses = 0  # Acquires that had to create a new one
+
+
+def acquire(cls, name, *args, **kwargs):
+    """ Get an entity like cls(name, *args, **kwargs), recycled from the pool if possible """
+    global hits, misses
+    key = (cls, name)
+    free = pools.get(key)
+    if free:
+        e = free.pop()
+        e.reset(name, *args, **kwargs)
+        hits += 1
+    else:
+        e = cls(name, *args, **kwargs)
+        misses += 1
+    e.pool_key = key
+    return e
+
+
+def release(e):
+    """ Give an entity back once nothing refers to it anymore """
+    free = pools.setdefault(e.pool_key, [])
+    e.pool_key = None  # Can't be released twice before being acquired again
+    e.world = None
+    if len(free) < MAX_FREE:
+        free.append(e)
+
+
+def free_count():
+    return sum(len(free) for free in pools.values())
@@ -0,0 +1,59 @@
+import time
+from collections import deque
+
+
+"""
+Measures how long each phase of a frame takes.
+Call lap(name) right after each phase to charge it the time since the previous lap, then end_frame() once per frame.
+The last HISTORY frames are kept for the debug overlay's frame graph.
+"""
+
+PHASES = ("events", "spawners", "spread", "update", "collisions", "sort", "world", "entities", "hud", "flip")
+HISTORY = 240  # Frames kept, 4 seconds at 60 FPS
+
+frame = {}  # Phase name -> seconds spent in it so far this frame
+history = deque(maxlen=HISTORY)  # (phase timings, total frame seconds) of the most recent frames
+last_lap = time.perf_counter()
+frame_start = last_lap
+
+
+def lap(name):
+    global last_lap
+    now = time.perf_counter()
+    frame[name] = frame.get(name, 0) + now - last_lap
+    last_lap = now
+
+
+def end_frame():
+    """ Get this frame's phase timings (seconds) and start timing the next frame """
+    global last_lap, frame_start
+    now = time.perf_counter()
+    timings = dict(frame)
+    history.append((timings, now - frame_start))
+    frame.clear()
+    last_lap = frame_start = now
+    return timings
+
+
+def skip_frame():
+    """ Start timing the next frame without keeping this one, e.g. while paused """
+    global last_lap, frame_start
+    frame.clear()
+    last_lap = frame_start = time.perf_counter()
+
+
+def frame_times():
+    return [total for timings, total in history]
+
+
+def worst():
+    """ Longest frame in the history (seconds) """
+    return max(frame_times(), default=0)
+
+
+def percentile(fraction):
+    """ Frame time (seconds) that this fraction of the frames in the history are no longer than """
+    times = sorted(frame_times())
+    if not times:
+        return 0
+    return times[min(len(times) - 1, int(fraction * len(times)))]
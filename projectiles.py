@@ -0,0 +1,257 @@
+from globals import Globals
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+"""
+Moves and collides all of a world's projectiles at once.
+While a projectile is in a world its position, velocity, time and distance live in this manager's arrays (one row per
+projectile), and are only copied back onto the Projectile object where the rest of the game reads them.
+Without numpy every projectile just runs its own update and collisions instead.
+"""
+
+
+class ProjectileManager:
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.count = 0  # Rows in use, including ones freed by remove until the next compact
+        self.projectiles = []  # Row -> Projectile, or None once removed
+        self.rows = {}  # Projectile -> row
+
+        if np is not None:
+            self.x = np.zeros(capacity)
+            self.y = np.zeros(capacity)
+            self.vel_x = np.zeros(capacity)
+            self.vel_y = np.zeros(capacity)
+            self.init_vel_x = np.zeros(capacity)
+            self.init_vel_y = np.zeros(capacity)
+            self.speed = np.zeros(capacity)
+            self.time = np.zeros(capacity)
+            self.lifetime = np.zeros(capacity)
+            self.distance = np.zeros(capacity)
+            self.range = np.zeros(capacity)
+            self.width = np.zeros(capacity)
+            self.height = np.zeros(capacity)
+
+    def arrays(self):
+        return (self.x, self.y, self.vel_x, self.vel_y, self.init_vel_x, self.init_vel_y, self.speed,
+                self.time, self.lifetime, self.distance, self.range, self.width, self.height)
+
+    def grow(self):
+        self.capacity *= 2
+        for name in ("x", "y", "vel_x", "vel_y", "init_vel_x", "init_vel_y", "speed",
+                     "time", "lifetime", "distance", "range", "width", "height"):
+            array = np.zeros(self.capacity)
+            array[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, array)
+
+    def contains(self, p):
+        return p in self.rows
+
+    def add(self, p):
+        if np is not None:
+            if self.count == self.capacity:
+                self.grow()
+            row = self.count
+            values = (p.pos.x, p.pos.y, p.vel.x, p.vel.y, p.init_vel.x, p.init_vel.y, p.speed,
+                      p.time, p.lifetime, p.distance, p.range, p.size.x, p.size.y)
+            for array, value in zip(self.arrays(), values):
+                array[row] = value
+        else:
+            row = self.count
+        self.count += 1
+        self.projectiles.append(p)
+        self.rows[p] = row
+
+    def remove(self, p):
+        row = self.rows.pop(p, None)
+        if row is None:
+            return
+        self.projectiles[row] = None
+        if np is not None:
+            # Hand the projectile's state back in case it gets added to a world again
+            p.time = float(self.time[row])
+            p.distance = float(self.distance[row])
+
+    def compact(self):
+        # Pack the rows of removed projectiles out, keeping the rest in order
+        if len(self.rows) == self.count:
+            return
+        keep = [row for row in range(self.count) if self.projectiles[row] is not None]
+        if np is not None:
+            for array in self.arrays():
+                array[:len(keep)] = array[keep]
+        self.projectiles = [self.projectiles[row] for row in keep]
+        self.rows = {p: row for row, p in enumerate(self.projectiles)}
+        self.count = len(keep)
+
+    def update(self, world, player):
+        if np is None:
+            for p in self.projectiles:
+                if p is not None:
+                    p.update(world, player)
+            return
+
+        n = self.count
+        if n == 0:
+            return
+        projectiles = self.projectiles[:n]  # Projectiles added by death callbacks wait until next frame
+        delta_time = Globals.delta_time
+        x, y = self.x[:n], self.y[:n]
+        vel_x, vel_y = self.vel_x[:n], self.vel_y[:n]
+        speed, time, distance = self.speed[:n], self.time[:n], self.distance[:n]
+
+        time += delta_time
+
+        # Same speed limit as Entity.update
+        speed2 = vel_x*vel_x + vel_y*vel_y
+        too_fast = np.nonzero(speed2 > speed*speed)[0]
+        if len(too_fast) > 0:
+            factor = speed[too_fast] / np.sqrt(speed2[too_fast])
+            vel_x[too_fast] *= factor
+            vel_y[too_fast] *= factor
+
+        x += vel_x * delta_time
+        y += vel_y * delta_time
+        # Range only counts movement of the projectile's own, not what it inherited from its parent
+        distance += np.abs(np.hypot(vel_x - self.init_vel_x[:n], vel_y - self.init_vel_y[:n]) * delta_time)
+
+        # Entities with a lifetime shrink away at the end of it, which changes their hitbox
+        lifetime = self.lifetime[:n]
+        for row in np.nonzero(lifetime != -1)[0].tolist():
+            p = projectiles[row]
+            if p is None:
+                continue
+            if time[row] > lifetime[row]:
+                p.alive = False
+            else:
+                p.shrink(min(1, (lifetime[row] - time[row])/125))
+                self.width[row], self.height[row] = p.size.x, p.size.y
+
+        expired = (distance > self.range[:n]) & (time > 50)
+        if world.solid_border:
+            # Hits the border if within "radius" length
+            half_w, half_h = self.width[:n]/2, self.height[:n]/2
+            hits_border = (x <= half_w) | (x >= world.size.x - half_w) | (y <= half_h - 100) | (y >= world.size.y - half_h)
+            expired |= hits_border & (time > 50)
+
+        for p, new_x, new_y, new_time in zip(projectiles, x.tolist(), y.tolist(), time.tolist()):
+            if p is not None:
+                p.pos.set(new_x, new_y)
+                p.time = new_time
+                p.sync_hitbox()
+        for row in too_fast.tolist():
+            p = projectiles[row]
+            if p is not None:
+                p.vel.set(float(vel_x[row]), float(vel_y[row]))
+
+        for row in np.nonzero(expired)[0].tolist():
+            p = projectiles[row]
+            if p is not None and p.alive:
+                if p.death_func is not None:
+                    p.death_func(p, world, p.team)
+                p.alive = False
+
+    def collide(self, world):
+        """ Collide every projectile with the entities its hitbox overlaps """
+        # Projectiles never affect each other, so only entities in the broad-phase grid cells they cover need testing
+        if np is None:
+            for p in self.projectiles:
+                if p is not None:
+                    collisions = set([])
+                    for other in world.grid.query(p):
+                        if world.grid.contains(other) and p.colliding(other):
+                            p.collide(other, world)
+                            collisions.add(other)
+                    p.last_collisions = collisions
+            return
+
+        # Collisions can spawn projectiles (explosions, clouds), which get collided in the same pass like above
+        start = 0
+        while start < self.count:
+            end = self.count
+            self.collide_rows(world, range(start, end))
+            start = end
+
+    def collide_rows(self, world, rows):
+        """ Collide the projectiles in rows with the entities their hitboxes overlap """
+        rows = [row for row in rows if self.projectiles[row] is not None]
+        projectiles = [self.projectiles[row] for row in rows]
+        if not projectiles:
+            return
+        pairs, targets = self.candidates(world.grid, np.array(rows))
+        collisions = [set([]) for p in projectiles]
+        if len(pairs) > 0:
+            pair_rows, pair_targets = pairs // len(targets), pairs % len(targets)
+            boxes = np.array([tuple(p.hitbox) for p in projectiles], dtype=float)[pair_rows]
+            target_boxes = np.array([tuple(e.hitbox) for e in targets], dtype=float)[pair_targets]
+            left, top, width, height = boxes.T
+            target_left, target_top, target_width, target_height = target_boxes.T
+
+            # Same overlap test as pygame.Rect.colliderect, where empty rects never collide
+            hits = (left < target_left + target_width) & (target_left < left + width) & \
+                   (top < target_top + target_height) & (target_top < top + height)
+            hits &= (width > 0) & (height > 0) & (target_width > 0) & (target_height > 0)
+
+            for row, target in zip(pair_rows[hits].tolist(), pair_targets[hits].tolist()):
+                p, other = projectiles[row], targets[target]
+                if world.grid.contains(other):  # Skip entities that left the world earlier in this pass
+                    p.collide(other, world)
+                    collisions[row].add(other)
+        for p, hit in zip(projectiles, collisions):
+            p.last_collisions = hit
+
+    def candidates(self, grid, rows):
+        """ Find every (projectile, entity) pair that shares a cell of the grid, the same ones grid.query would find
+        Returns the pairs encoded as projectile index * len(entities) + entity index, and the entities """
+        # The cells each projectile covers, worked out like SpatialHash.cell_range
+        cs = grid.cell_size
+        half_w, half_h = self.width[rows]/2, self.height[rows]/2
+        x0 = np.floor_divide(self.x[rows] - half_w, cs).astype(int)
+        y0 = np.floor_divide(self.y[rows] - half_h, cs).astype(int)
+        x1 = np.floor_divide(self.x[rows] + half_w, cs).astype(int)
+        y1 = np.floor_divide(self.y[rows] + half_h, cs).astype(int)
+
+        # One (projectile, cell) entry per cell covered. Projectiles are small, so most cover one to four cells
+        span_x, span_y = int((x1 - x0).max()) + 1, int((y1 - y0).max()) + 1
+        if span_x == 1 and span_y == 1:
+            indices, cell_x, cell_y = np.arange(len(rows)), x0, y0
+        else:
+            indices, cell_x, cell_y = [], [], []
+            for dx in range(span_x):
+                for dy in range(span_y):
+                    covers = np.nonzero((x0 + dx <= x1) & (y0 + dy <= y1))[0]
+                    indices.append(covers)
+                    cell_x.append(x0[covers] + dx)
+                    cell_y.append(y0[covers] + dy)
+            indices, cell_x, cell_y = np.concatenate(indices), np.concatenate(cell_x), np.concatenate(cell_y)
+
+        # Numbered by one key per cell, so finding the distinct cells is a single sort
+        left, top = int(cell_x.min()), int(cell_y.min())
+        height = int(cell_y.max()) - top + 1
+        keys, cell_of = np.unique((cell_x - left) * height + (cell_y - top), return_inverse=True)
+        cells = zip((keys // height + left).tolist(), (keys % height + top).tolist())
+
+        # Look up each distinct cell once, numbering the entities found in them
+        targets = {}
+        cell_targets = []
+        for cell_key in cells:
+            cell = grid.cells.get(cell_key, ())
+            cell_targets.append([targets.setdefault(e, len(targets)) for e in cell])
+        if not targets:
+            return np.zeros(0, dtype=int), []
+        counts = np.array([len(found) for found in cell_targets])
+        flat = np.array([target for found in cell_targets for target in found], dtype=int)
+        starts = np.cumsum(counts) - counts
+
+        # Pair every projectile with every entity in each of its cells
+        pair_counts = counts[cell_of]
+        first = np.repeat(starts[cell_of], pair_counts)
+        within = np.arange(pair_counts.sum()) - np.repeat(np.cumsum(pair_counts) - pair_counts, pair_counts)
+        pairs = np.repeat(indices, pair_counts) * len(targets) + flat[first + within]
+        if span_x > 1 or span_y > 1:
+            pairs = np.unique(pairs)  # Drop pairs found in more than one cell, and put them back in projectile order
+        return pairs, list(targets)
@@ -0,0 +1,100 @@
+import pygame
+import util
+from globals import Globals
+
+
+"""
+Collects what entities draw during a frame so it can be drawn in a few calls instead of one per entity.
+Entities queue their sprites, health bars and debug outlines while rendering, then flush(surface) draws
+each kind in one pass: all the sprites in a single blits call, in the order they were queued, then the bars on top.
+
+With Globals.DIRTY_RECTS on, it also keeps track of which parts of the screen were drawn on (by entities, particles
+and the HUD) so update_display only has to update those, plus whatever was drawn there the frame before.
+Whenever the camera moves everything on screen changes, so the whole window is updated instead.
+"""
+
+# pygame-ce's fblits is faster than blits, but takes no source areas
+FBLITS = hasattr(pygame.Surface, "fblits")
+
+sprites = []  # (image, destination) or (image, destination, area) in drawing order
+has_area = False
+bars = []  # (color, rect) filled after all the sprites, a bar's background before its foreground
+outlines = []  # (color, rect, width) drawn last
+
+dirty = []  # Screen rects drawn on this frame, only kept in dirty rect mode
+last_dirty = []  # And on the frame before, which have to be updated to erase what was there
+view = None  # The world and where it was drawn on the screen last frame
+full_update = True  # Whether the next update_display has to update the whole window
+
+
+def blit(image, dest, area=None):
+    global has_area
+    if area is None:
+        sprites.append((image, dest))
+    else:
+        sprites.append((image, dest, area))
+        has_area = True
+
+
+def bar(pos, size, proportion, fg_color, bg_color, center=True):
+    """ Queue a bar like util.draw_bar draws """
+    rect, fg_rect = util.bar_rects(pos, size, proportion, center)
+    bars.append((bg_color, rect))
+    bars.append((fg_color, fg_rect))
+
+
+def outline(color, rect, width):
+    outlines.append((color, rect, width))
+
+
+def flush(surface):
+    """ Draw everything queued onto surface and empty the queue """
+    global has_area
+    if sprites:
+        if FBLITS and not has_area:
+            surface.fblits(sprites)
+        else:
+            surface.blits(sprites, False)
+        sprites.clear()
+        has_area = False
+
+    # Clipped first, since fill draws a rect hanging off the left edge at its full width from x = 0
+    screen = surface.get_rect()
+    for color, rect in bars:
+        surface.fill(color, screen.clip(rect))
+    bars.clear()
+
+    for color, rect, width in outlines:
+        pygame.draw.rect(surface, color, rect, width)
+    outlines.clear()
+
+
+def mark(rect):
+    """ Note that this part of the screen was drawn on this frame """
+    if Globals.DIRTY_RECTS and rect is not None:
+        dirty.append(rect)
+
+
+def set_view(world, offset):
+    """ Note which world is drawn where on the screen this frame, so changing either updates the whole window """
+    global view
+    if (world, offset) != view:
+        view = (world, offset)
+        invalidate()
+
+
+def invalidate():
+    """ Make the next update_display update the whole window, e.g. after drawing over all of it """
+    global full_update
+    full_update = True
+
+
+def update_display():
+    """ Show this frame, updating only the parts of the window that changed in dirty rect mode """
+    global last_dirty, dirty, full_update
+    if Globals.DIRTY_RECTS and not full_update:
+        pygame.display.update(last_dirty + dirty)
+    else:
+        pygame.display.flip()
+    last_dirty, dirty = dirty, []
+    full_update = False
@@ -0,0 +1,68 @@
+import math
+from entity import NEUTRAL
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+"""
+Separation ("spread") forces that push AI away from their teammates and from neutral entities.
+Each source is pushed away from every other entity that is either neutral, or on its team with health left and
+within its sight range. A neighbor at distance d contributes 1 / (d + 0.2) along the direction away from it.
+"""
+
+
+def spread_forces(sources, entities):
+    """ Get the (x, y) separation acceleration of each source, computed against all entities at once """
+    if len(sources) == 0:
+        return []
+    if np is None:
+        return spread_forces_python(sources, entities)
+    return spread_forces_numpy(sources, entities)
+
+
+def spread_forces_numpy(sources, entities):
+    index = {e: i for i, e in enumerate(entities)}
+    src = np.array([index[e] for e in sources])
+
+    pos = np.array([(e.pos.x, e.pos.y) for e in entities], dtype=float)
+    team = np.array([e.team for e in entities], dtype=float)
+    healthy = np.array([e.health > 0 for e in entities])
+    sight = np.array([e.sight_range for e in sources], dtype=float)
+
+    # Direction and distance from every neighbor to every source
+    diff = pos[src, None, :] - pos[None, :, :]
+    dist = np.hypot(diff[..., 0], diff[..., 1])
+
+    neighbors = (team[src, None] == team[None, :]) & healthy[None, :] & (dist <= sight[:, None])
+    neighbors |= (team == NEUTRAL)[None, :]
+    neighbors[np.arange(len(sources)), src] = False
+    neighbors &= dist > 0  # Entities on the exact same spot have no direction to spread in
+
+    # norm(diff) * 1 / (dist + 0.2), folded into one weight per pair
+    weight = np.zeros_like(dist)
+    d = dist[neighbors]
+    weight[neighbors] = 1 / (d * (d + 0.2))
+    force = (diff * weight[..., None]).sum(axis=1)
+    return [(x, y) for x, y in force.tolist()]
+
+
+def spread_forces_python(sources, entities):
+    forces = []
+    for e in sources:
+        x, y = e.pos.x, e.pos.y
+        ax = ay = 0
+        for other in entities:
+            if other is e:
+                continue
+            dx, dy = x - other.pos.x, y - other.pos.y
+            dist = math.hypot(dx, dy)
+            if dist > 0 and (other.team == NEUTRAL or
+                             (other.team == e.team and other.health > 0 and dist <= e.sight_range)):
+                weight = 1 / (dist * (dist + 0.2))
+                ax += dx * weight
+                ay += dy * weight
+        forces.append((ax, ay))
+    return forces
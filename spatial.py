@@ -0,0 +1,95 @@
+class SpatialHash:
+    """ Uniform grid that buckets entities by every cell their hitbox overlaps """
+
+    def __init__(self, cell_size=200):
+        self.cell_size = cell_size
+        self.cells = {}  # (cell x, cell y) -> dict of entities in that cell (dicts keep insertion order)
+        self.entity_cells = {}  # entity -> (x0, y0, x1, y1) range of cells it is currently stored in
+
+    def cell_range(self, e):
+        cs = self.cell_size
+        half_w, half_h = e.size.x/2, e.size.y/2
+        return (int((e.pos.x - half_w) // cs), int((e.pos.y - half_h) // cs),
+                int((e.pos.x + half_w) // cs), int((e.pos.y + half_h) // cs))
+
+    def contains(self, e):
+        return e in self.entity_cells
+
+    def insert(self, e):
+        if e in self.entity_cells:
+            self.remove(e)
+        cell_range = self.cell_range(e)
+        self.entity_cells[e] = cell_range
+        x0, y0, x1, y1 = cell_range
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = self.cells.get((cx, cy))
+                if cell is None:
+                    cell = self.cells[(cx, cy)] = {}
+                cell[e] = None
+
+    def remove(self, e):
+        cell_range = self.entity_cells.pop(e, None)
+        if cell_range is None:
+            return
+        x0, y0, x1, y1 = cell_range
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = self.cells[(cx, cy)]
+                del cell[e]
+                if not cell:
+                    del self.cells[(cx, cy)]
+
+    def update(self, e):
+        # Only re-bucket when the entity has crossed into a different set of cells
+        old_range = self.entity_cells.get(e)
+        if old_range is not None and old_range != self.cell_range(e):
+            self.insert(e)
+
+    def query(self, e):
+        """ Get every other entity sharing at least one cell with this entity """
+        cell_range = self.entity_cells.get(e)
+        if cell_range is None:
+            cell_range = self.cell_range(e)
+        x0, y0, x1, y1 = cell_range
+
+        if x0 == x1 and y0 == y1:
+            cell = self.cells.get((x0, y0), ())
+            return [other for other in cell if other is not e]
+
+        found = {}
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = self.cells.get((cx, cy))
+                if cell is not None:
+                    found.update(cell)
+        found.pop(e, None)
+        return list(found)
+
+    def nearest(self, pos, radius, condition=None):
+        """ Get the closest entity (by center) within radius of pos that meets the condition, or None """
+        cs = self.cell_size
+        center_x, center_y = int(pos.x // cs), int(pos.y // cs)
+        max_ring = int(radius // cs) + 1
+        best = None
+        best_dist = radius * radius
+
+        # Search outward one ring of cells at a time, stopping once no closer entity can be in the next ring
+        for ring in range(max_ring + 1):
+            for cx in range(center_x - ring, center_x + ring + 1):
+                edge = cx == center_x - ring or cx == center_x + ring
+                step = 1 if edge else 2 * ring
+                for cy in range(center_y - ring, center_y + ring + 1, max(step, 1)):
+                    cell = self.cells.get((cx, cy))
+                    if cell is None:
+                        continue
+                    for other in cell:
+                        dx, dy = other.pos.x - pos.x, other.pos.y - pos.y
+                        dist = dx*dx + dy*dy
+                        closer = dist < best_dist or (best is None and dist == best_dist)
+                        if closer and (condition is None or condition(other)):
+                            best = other
+                            best_dist = dist
+            if best is not None and best_dist <= (ring * cs)**2:
+                break
+        return best
@@ -1,85 +1,133 @@
-import math
-
-""" 2-dimensional vector class """
-class Vec:
-
-    @staticmethod
-    def polar(r, theta):
-        vec = Vec(math.cos(math.radians(theta)),
-                  math.sin(math.radians(theta))) * r
-        return vec
-
-    def __init__(self, x, y = None):
-        self.set(x, y)
-
-    def set(self, x, y=None):
-        if y is None:
-            # if two arguments, then use them as components
-            try:
-                self.x = x.x
-                self.y = x.y
-            except AttributeError:
-                self.x = x[0]
-                self.y = x[1]
-        else:
-            # if one argument, assume it's a vector & copy its components
-            self.x = x
-            self.y = y
-    
-    def __add__(self, v):
-        return Vec(self.x + v.x, self.y + v.y)
-    
-    def __sub__(self, v):
-        return Vec(self.x - v.x, self.y - v.y)
-    
-    def __mul__(self, c):
-        return Vec(self.x * c, self.y * c)
-    
-    def __rmul__(self, c):
-        return self.__mul__(c)
-    
-    def __truediv__(self, c):
-        return Vec(self.x / c, self.y / c)
-    
-    def __floordiv__(self, c):
-        return Vec(self.x / c, self.y / c)
-    
-    def __eq__(self, v):
-        return self.x == v.x and self.y == v.y
-        
-    def __neg__(self):
-        return Vec(-self.x, -self.y)
-
-    def mag(self):
-        return math.sqrt(self.x**2 + self.y**2)
-
-    def angle(self):
-        return -math.degrees(math.atan2(self.y, self.x))
-
-    """ Get the rounded version of the vector """
-    def rounded(self):
-        return Vec(round(self.x), round(self.y))
-
-    """ Get the rounded down version of the vector """
-    def floored(self):
-        return Vec(round(self.x), round(self.y))
-    
-    """ Get the normalized vector, keeping the ratio of the components """
-    def norm(self):
-        mag = self.mag()
-        if mag == 0:
-            return Vec(0, 0)
-        return Vec(self.x / mag, self.y / mag)
-    
-    def dist(self, v):
-        return math.hypot(self.x - v.x, self.x - v.x)
-
-    def dot(self, v):
-        return self.x * v.x + self.y * v.y
-
-    def tuple(self):
-        return (self.x, self.y)
-    
-    def __str__(self):
-        return "({x}, {y})".format(x = round(self.x, 1), y = round(self.y, 1))
-    
+import math
+
+""" 2-dimensional vector class """
+class Vec:
+    __slots__ = ("x", "y")
+
+    @staticmethod
+    def polar(r, theta):
+        vec = Vec(math.cos(math.radians(theta)),
+                  math.sin(math.radians(theta))) * r
+        return vec
+
+    def __init__(self, x, y = None):
+        self.set(x, y)
+
+    def set(self, x, y=None):
+        if y is None:
+            # if two arguments, then use them as components
+            try:
+                self.x = x.x
+                self.y = x.y
+            except AttributeError:
+                self.x = x[0]
+                self.y = x[1]
+        else:
+            # if one argument, assume it's a vector & copy its components
+            self.x = x
+            self.y = y
+    
+    def __add__(self, v):
+        return Vec(self.x + v.x, self.y + v.y)
+    
+    def __sub__(self, v):
+        return Vec(self.x - v.x, self.y - v.y)
+    
+    def __mul__(self, c):
+        return Vec(self.x * c, self.y * c)
+
+    # In-place operators change this vector instead of making a new one
+    def __iadd__(self, v):
+        self.x += v.x
+        self.y += v.y
+        return self
+
+    def __isub__(self, v):
+        self.x -= v.x
+        self.y -= v.y
+        return self
+
+    def __imul__(self, c):
+        self.x *= c
+        self.y *= c
+        return self
+
+    """ Add another vector multiplied by c to this one, without creating a new vector """
+    def add_scaled(self, v, c):
+        self.x += v.x * c
+        self.y += v.y * c
+        return self
+    
+    def __rmul__(self, c):
+        return self.__mul__(c)
+    
+    def __truediv__(self, c):
+        return Vec(self.x / c, self.y / c)
+    
+    def __floordiv__(self, c):
+        return Vec(self.x / c, self.y / c)
+    
+    def __eq__(self, v):
+        return self.x == v.x and self.y == v.y
+        
+    def __neg__(self):
+        return Vec(-self.x, -self.y)
+
+    def mag(self):
+        return math.sqrt(self.x**2 + self.y**2)
+
+    """ Get the squared magnitude, which is cheaper when only comparing lengths """
+    def mag2(self):
+        return self.x*self.x + self.y*self.y
+
+    def angle(self):
+        return -math.degrees(math.atan2(self.y, self.x))
+
+    """ Get the rounded version of the vector """
+    def rounded(self):
+        return Vec(round(self.x), round(self.y))
+
+    """ Get the rounded down version of the vector """
+    def floored(self):
+        return Vec(round(self.x), round(self.y))
+    
+    """ Get the normalized vector, keeping the ratio of the components """
+    def norm(self):
+        mag = self.mag()
+        if mag == 0:
+            return Vec(0, 0)
+        return Vec(self.x / mag, self.y / mag)
+
+    """ Normalize this vector in place """
+    def normalize(self):
+        mag = self.mag()
+        if mag != 0:
+            self.x /= mag
+            self.y /= mag
+        return self
+
+    """ Scale this vector in place so that its magnitude is length """
+    def scale_to(self, length):
+        self.normalize()
+        self.x *= length
+        self.y *= length
+        return self
+    
+    def dist(self, v):
+        return math.hypot(self.x - v.x, self.y - v.y)
+
+    """ Get the squared distance to another vector, which is cheaper when only comparing distances """
+    def dist2(self, v):
+        dx = self.x - v.x
+        dy = self.y - v.y
+        return dx*dx + dy*dy
+
+    def dot(self, v):
+        return self.x * v.x + self.y * v.y
+
+    def tuple(self):
+        return (self.x, self.y)
+    
+    def __str__(self):
+        return "({x}, {y})".format(x = round(self.x, 1), y = round(self.y, 1))
+    
@@ -1,124 +1,305 @@
-import pygame
-import random
-from vector import Vec
-import util
-from globals import Globals
-import assets
-from entity import *
-
-
-class World:
-    def __init__(self, name, size, outer_color, inner_color=None, dark=False, solid_border=False, image=None, music=None, complete_condition=None):
-        self.name = name
-        self.size = size
-        self.bg_surface = pygame.Surface(size.tuple(), pygame.SRCALPHA, 32).convert()
-        self.border = Vec(250, 250)
-        self.outer_color, = outer_color,
-        self.inner_color, = inner_color,
-        self.dark = dark
-        self.solid_border = solid_border
-        self.image = image
-        self.music = music
-
-        # When this boolean getter function is true, spawn the next world sign
-        # By default it is when all dungeons are defeated
-        if complete_condition is None:
-            self.complete_condition = lambda w: w.dungeons_defeated == len(w.dungeons) and len(w.dungeons) != 0
-        else:
-            self.complete_condition = complete_condition
-        self.completed = False
-
-        rect = util.rect_center(size/2, size)
-        if inner_color is not None:
-            self.bg_surface.fill(inner_color)
-        if image is not None:
-            self.bg_surface.blit(pygame.transform.scale(image, self.size.rounded().tuple()), rect)
-
-        self.entities = []
-        self.spawners = []
-        self.dungeons = []
-        self.dungeons_defeated = 0
-        self.time_elapsed = 0
-
-        self.enemies = set([])
-        self.allies = set([])
-
-
-    def start_music(self):
-        if self.music is not None:
-            pygame.mixer.music.load(self.music)
-            if Globals.sound_on:
-                pygame.mixer.music.play(-1)
-        else:
-            pygame.mixer.music.pause()
-
-    def render(self, surface, pos):
-        surface.blit(self.bg_surface, pos.tuple())
-
-    def add(self, pos, e):
-        self.entities.append(e)
-        e.world = self
-        e.pos = Vec(pos)
-
-        if not isinstance(e, Projectile):
-            if e.team == ENEMY:
-                self.enemies.add(e)
-            elif e.team == ALLY and not e.is_player:
-                self.allies.add(e)
-                #print(e)
-
-    def remove(self, e):
-        if e in self.entities:
-            self.entities.remove(e)
-
-            # remove from enemies and allies in case the entity was in those sets
-            # sets are nice because you don't have to check if something's there to try to remove it
-            self.enemies.discard(e)
-            self.allies.discard(e)
-
-            for spawner in self.spawners:
-                for spawn in spawner.spawned:
-                    if spawn == e:
-                        spawner.spawned.remove(e)
-
-    def add_spawner(self, spawner):
-        self.spawners.append(spawner)
-
-    def add_dungeon(self, pos, entrance):
-        self.add(pos, entrance)
-        self.dungeons.append(entrance)
-
-    def rand_pos(self):
-        return Vec(random.randint(0, self.size.x), random.randint(0, self.size.y))
-
-
-class Spawner:
-    def __init__(self, interval, spawn_func, spawn_limit=4, spawn_amount=1, destination=None, ):
-        self.interval = interval
-        self.spawn_func = spawn_func
-        self.spawn_limit = spawn_limit      # Only spawns when there aren't too many already existing
-        self.spawn_amount = spawn_amount    # Number to spawn at once
-        self.destination = destination      # Specific position to spawn in world
-        self.time = 0
-        self.spawned = []
-
-    def update(self, world):
-        self.time += Globals.delta_time
-        if self.time > self.interval:
-            self.spawn(world)
-            self.time = 0
-
-    def spawn(self, world):
-        spawn_pos = Vec(0, 0)
-        if self.destination is None:  # If no destination specified, choose random position in world
-            spawn_pos = world.rand_pos()
-        else:
-            # Else destination is specific position in world
-            spawn_pos = self.destination
-
-        for i in range(self.spawn_amount):
-            if len(self.spawned) < self.spawn_limit:
-                entity = self.spawn_func()
-                self.spawned.append(entity)
-                world.add(spawn_pos, entity)
-                entity.keep_in_bounds(world)
\ No newline at end of file
+import pygame
+import random
+import math
+from operator import attrgetter
+from vector import Vec
+from globals import Globals
+from entity import *
+from spatial import SpatialHash
+import separation
+import pool
+from particles import ParticleSystem
+from projectiles import ProjectileManager
+
+TILE_SIZE = 512  # Background images are cut into square tiles so only the ones on screen get drawn
+
+
+class World:
+    def __init__(self, name, size, outer_color, inner_color=None, dark=False, solid_border=False, image=None, music=None, complete_condition=None):
+        self.name = name
+        self.size = size
+        self.border = Vec(250, 250)
+        self.outer_color, = outer_color,
+        self.inner_color, = inner_color,
+        self.dark = dark
+        self.solid_border = solid_border
+        self.image = image
+        self.music = music
+
+        # When this boolean getter function is true, spawn the next world sign
+        # By default it is when all dungeons are defeated
+        if complete_condition is None:
+            self.complete_condition = lambda w: w.dungeons_defeated == len(w.dungeons) and len(w.dungeons) != 0
+        else:
+            self.complete_condition = complete_condition
+        self.completed = False
+
+        # Plain color worlds store no pixels at all, they are just filled in on render
+        self.bg_color = (0, 0, 0) if inner_color is None else inner_color
+        self.tiles = {}  # (tile x, tile y) -> Surface
+        if image is not None:
+            self.make_tiles(image)
+
+        self.entities = []
+        self.grid = SpatialHash()  # Broad-phase for collisions, kept up to date as entities move (projectiles excluded)
+        self.projectiles = ProjectileManager()  # Moves and collides every projectile in bulk
+        # Removed entities stay in the entities list until the next compact, so removing never shifts the list
+        self.pending_removal = set([])
+        self.particles = ParticleSystem()  # Effects that aren't entities, like damage numbers, poofs and blood
+        self.spawners = []
+        self.dungeons = []
+        self.dungeons_defeated = 0
+        self.time_elapsed = 0
+
+        self.enemies = set([])
+        self.allies = set([])
+        self.steps = 0
+        self.thinking = None  # The AI allowed to think this step, or None for all of it
+        self.ai_tier_counts = [0] * (len(Globals.AI_TIERS) + 1)  # AI in each tier at the last schedule, the last being too far to think
+        # Per-team indexes of everything that can be targeted (projectiles excluded), used for AI targeting
+        self.teams = {
+            ALLY: SpatialHash(),
+            ENEMY: SpatialHash(),
+            NEUTRAL: SpatialHash(),
+        }
+
+
+    def start_music(self):
+        if self.music is not None:
+            pygame.mixer.music.load(self.music)
+            if Globals.sound_on:
+                pygame.mixer.music.play(-1)
+        else:
+            pygame.mixer.music.pause()
+
+    def make_tiles(self, image):
+        scaled_image = pygame.transform.scale(image, self.size.rounded().tuple())
+        for tile_x in range(math.ceil(self.size.x / TILE_SIZE)):
+            for tile_y in range(math.ceil(self.size.y / TILE_SIZE)):
+                rect = pygame.Rect(tile_x * TILE_SIZE, tile_y * TILE_SIZE, TILE_SIZE, TILE_SIZE).clip(scaled_image.get_rect())
+                tile = pygame.Surface(rect.size).convert()
+                tile.fill(self.bg_color)
+                tile.blit(scaled_image, (0, 0), rect)
+                self.tiles[(tile_x, tile_y)] = tile
+
+    def render(self, surface, pos):
+        # pos is where the world's top left corner is on the surface
+        x, y = int(pos.x), int(pos.y)
+        visible = pygame.Rect(x, y, self.size.x, self.size.y).clip(surface.get_rect())
+        if visible.width <= 0 or visible.height <= 0:
+            return
+
+        if not self.tiles:
+            surface.fill(self.bg_color, visible)
+            return
+
+        # Only blit the tiles that intersect the visible part of the world
+        for tile_x in range((visible.left - x) // TILE_SIZE, (visible.right - 1 - x) // TILE_SIZE + 1):
+            for tile_y in range((visible.top - y) // TILE_SIZE, (visible.bottom - 1 - y) // TILE_SIZE + 1):
+                tile = self.tiles.get((tile_x, tile_y))
+                if tile is not None:
+                    surface.blit(tile, (x + tile_x * TILE_SIZE, y + tile_y * TILE_SIZE))
+
+    def add(self, pos, e):
+        if e in self.pending_removal:
+            # Coming back before the list was compacted, so it's still in the list
+            self.pending_removal.discard(e)
+        else:
+            self.entities.append(e)
+        e.world = self
+        e.pos.set(pos)
+        e.prev_pos.set(pos)
+        e.sync_hitbox()
+
+        if isinstance(e, Projectile):
+            self.projectiles.add(e)
+        else:
+            self.grid.insert(e)
+            if e.team in self.teams:
+                self.teams[e.team].insert(e)
+            if e.team == ENEMY:
+                self.enemies.add(e)
+            elif e.team == ALLY and not e.is_player:
+                self.allies.add(e)
+                #print(e)
+
+    def contains(self, e):
+        # The broad-phase grid and the projectile manager hold exactly the entities that are currently in this world
+        return self.grid.contains(e) or self.projectiles.contains(e)
+
+    def remove(self, e):
+        if self.contains(e):
+            self.pending_removal.add(e)
+            self.grid.remove(e)
+            self.projectiles.remove(e)
+
+            # remove from enemies and allies in case the entity was in those sets
+            # sets are nice because you don't have to check if something's there to try to remove it
+            self.enemies.discard(e)
+            self.allies.discard(e)
+            if e.team in self.teams:
+                self.teams[e.team].remove(e)
+
+            if e.spawner is not None:
+                e.spawner.spawned.discard(e)
+                e.spawner = None
+
+    def compact(self):
+        # Drop every removed entity from the list in one pass
+        if self.pending_removal:
+            self.entities[:] = [e for e in self.entities if e not in self.pending_removal]
+            for e in self.pending_removal:
+                # Entities that moved on to another world in the meantime are still in use
+                if e.pool_key is not None and e.world is self:
+                    pool.release(e)
+            self.pending_removal.clear()
+            self.projectiles.compact()
+
+    def moved(self, e):
+        self.grid.update(e)
+        if e.team in self.teams:
+            self.teams[e.team].update(e)
+
+    def save_positions(self):
+        # Remember where everything is before the next step, so frames can be drawn in between the two
+        for e in self.entities:
+            e.prev_pos.x = e.pos.x
+            e.prev_pos.y = e.pos.y
+
+    def nearest_opponent(self, entity, radius, condition=None):
+        """ Get the closest entity within radius on a team that this entity targets, or None """
+        target = None
+        for team in TARGETS.get(entity.team, ()):
+            other = self.teams[team].nearest(entity.pos, radius, condition)
+            if other is not None:
+                if target is None or entity.pos.dist2(other.pos) < entity.pos.dist2(target.pos):
+                    target = other
+        return target
+
+    def schedule_ai(self, player):
+        """ Pick which AI thinks this step, by whether it's on screen and how far it is from the player """
+        self.steps += 1
+        self.thinking = set([])
+        counts = [0] * (len(Globals.AI_TIERS) + 1)
+        # Anything on screen or just off it always thinks
+        half_width, half_height = Globals.SIZE.x/2 + 200, Globals.SIZE.y/2 + 200
+        for e in self.entities:
+            if isinstance(e, AIEntity) and e not in self.pending_removal:
+                dx, dy = e.pos.x - player.pos.x, e.pos.y - player.pos.y
+                if abs(dx) <= half_width and abs(dy) <= half_height:
+                    tier = 0
+                else:
+                    dist2 = dx*dx + dy*dy
+                    tier = len(Globals.AI_TIERS)
+                    for i, (distance, interval) in enumerate(Globals.AI_TIERS):
+                        if dist2 <= distance * distance:
+                            tier = i
+                            break
+                counts[tier] += 1
+                e.ai_tier = tier
+                if tier < len(Globals.AI_TIERS) and (self.steps + e.think_phase) % Globals.AI_TIERS[tier][1] == 0:
+                    self.thinking.add(e)
+        self.ai_tier_counts = counts
+
+    def update_spread(self):
+        # Work out every thinking AI's separation force in one batch instead of each AI scanning the whole world
+        ai = [e for e in self.entities if isinstance(e, AIEntity) and (self.thinking is None or e in self.thinking)]
+        for e, force in zip(ai, separation.spread_forces(ai, self.entities)):
+            e.spread_force.set(force)
+
+    def sort_by_depth(self):
+        # Entities only move a little each frame, so the list is nearly sorted already
+        # An insertion sort fixes it in about O(n), but fall back to a full sort if too much has changed
+        entities = self.entities
+        moves = 0
+        for i in range(1, len(entities)):
+            e = entities[i]
+            depth = e.depth
+            j = i - 1
+            if entities[j].depth <= depth:
+                continue
+            while j >= 0 and entities[j].depth > depth:
+                entities[j + 1] = entities[j]
+                j -= 1
+            entities[j + 1] = e
+            moves += i - 1 - j
+            if moves > len(entities):
+                entities.sort(key=attrgetter("depth"))
+                return
+
+    def update_entities(self, player):
+        thinking = self.thinking
+        for e in self.entities:
+            if e not in self.pending_removal and not isinstance(e, Projectile):
+                if thinking is not None and isinstance(e, AIEntity):
+                    e.update(self, player, think=e in thinking)
+                else:
+                    e.update(self, player)
+        self.thinking = None  # Only scheduled for this step
+        self.projectiles.update(self, player)
+        self.particles.update(Globals.delta_time)
+
+    def collide_entities(self):
+        # Nothing happens when an entity touches a projectile, only the other way around, so projectiles go first on their own
+        self.projectiles.collide(self)
+
+        # Only test pairs of entities that share a grid cell instead of every pair in the world
+        for e in self.entities:
+            if e in self.pending_removal:
+                continue
+            if not isinstance(e, Projectile):
+                collisions = set([])
+                for other in self.grid.query(e):
+                    # Skip entities that left the world earlier in this pass
+                    if self.grid.contains(other) and e.colliding(other):
+                        e.collide(other, self)
+                        collisions.add(other)
+                e.last_collisions = collisions
+            if not e.alive:
+                self.remove(e)
+        # This is the end of the frame's simulation, so clear out everything that was removed
+        self.compact()
+
+    def add_spawner(self, spawner):
+        self.spawners.append(spawner)
+
+    def add_dungeon(self, pos, entrance):
+        self.add(pos, entrance)
+        self.dungeons.append(entrance)
+
+    def rand_pos(self):
+        return Vec(random.randint(0, self.size.x), random.randint(0, self.size.y))
+
+
+class Spawner:
+    def __init__(self, interval, spawn_func, spawn_limit=4, spawn_amount=1, destination=None, ):
+        self.interval = interval
+        self.spawn_func = spawn_func
+        self.spawn_limit = spawn_limit      # Only spawns when there aren't too many already existing
+        self.spawn_amount = spawn_amount    # Number to spawn at once
+        self.destination = destination      # Specific position to spawn in world
+        self.time = 0
+        self.spawned = set([])  # Each spawned entity points back here through entity.spawner
+
+    def update(self, world):
+        self.time += Globals.delta_time
+        if self.time > self.interval:
+            self.spawn(world)
+            self.time = 0
+
+    def spawn(self, world):
+        spawn_pos = Vec(0, 0)
+        if self.destination is None:  # If no destination specified, choose random position in world
+            spawn_pos = world.rand_pos()
+        else:
+            # Else destination is specific position in world
+            spawn_pos = self.destination
+
+        for i in range(self.spawn_amount):
+            if len(self.spawned) < self.spawn_limit:
+                entity = self.spawn_func()
+                entity.spawner = self
+                self.spawned.add(entity)
+                world.add(spawn_pos, entity)
+                entity.keep_in_bounds(world)
+                entity.moved()
\ No newline at end of file